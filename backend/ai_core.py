@@ -1,21 +1,49 @@
+import logging
 import re
-from config import CATEGORIES, DEPARTMENT_MAPPING, AUTO_RESOLVE_THRESHOLD
+from collections import Counter
+from typing import Tuple
+from config import API_MODEL, CATEGORIES, DEPARTMENT_MAPPING, AUTO_RESOLVE_THRESHOLD, LLM_GENERATION
+from rules import Rules, get_rules
+from llm_client import LLMError, get_llm_client
+from llm_cache import LLM_CACHE
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Кратко, одним предложением, перескажи обращение пользователя в техподдержку.\n\n"
+    "Обращение:\n{text}"
+)
+REPLY_PROMPT = (
+    "Ты специалист техподдержки. Напиши вежливый короткий ответ пользователю "
+    "на обращение категории {category}.\n\n"
+    "Обращение:\n{text}"
+)
 
-# Заглушка для LLM API
 async def llm(prompt: str) -> str:
     """
-    Placeholder for LLM API call (OpenAI, Anthropic, etc.)
-    Replace this with actual API call in production
+    LLM API call through the shared client (see llm_client.py)
+    Without a configured API key the MVP placeholder is returned
     """
-    # Example: 
-    # response = await openai.ChatCompletion.create(
-    #     model="gpt-4",
-    #     messages=[{"role": "user", "content": prompt}]
-    # )
-    # return response.choices[0].message.content
+    client = get_llm_client()
+    if client is None:
+        # For MVP - simple rule-based responses
+        return "AI response placeholder"
     
-    # For MVP - simple rule-based responses
-    return "AI response placeholder"
+    return await client.complete(prompt)
+
+def llm_generation_enabled() -> bool:
+    """Summaries and replies come from the LLM only when enabled and a key is configured"""
+    return LLM_GENERATION and get_llm_client() is not None
+
+async def cached_llm(function: str, prompt: str) -> str:
+    """llm() through the persistent completion cache, hits are counted per function"""
+    cached = await LLM_CACHE.aget(function, API_MODEL, prompt)
+    if cached is not None:
+        return cached
+    
+    response = await llm(prompt)
+    await LLM_CACHE.aput(API_MODEL, prompt, response)
+    return response
 
 def detect_language(text: str) -> str:
     """Detect if text is in Russian or Kazakh"""
@@ -37,52 +65,37 @@ def detect_language(text: str) -> str:
     
     return "ru"  # default
 
-def classify_category(text: str) -> str:
-    """Classify request category based on keywords"""
-    text_lower = text.lower()
-    
-    # Keywords for each category
-    keywords = {
-        "VPN": ["vpn", "впн", "подключ", "қосыл", "сеть", "желі"],
-        "Email": ["почт", "email", "outlook", "пошта", "хат", "письмо"],
-        "Hardware": ["принтер", "принтір", "компьютер", "компьютер", "мышь", "клавиатур", "монитор", "пернетақта"],
-        "Software": ["программ", "прилож", "софт", "бағдарлама", "қосымша", "установ", "орнату"],
-        "Access": ["доступ", "рұқсат", "қатынау", "пароль", "құпия", "права", "папк", "қалта"],
-        "Network": ["интернет", "сеть", "желі", "wifi", "вай-фай", "подключен", "байланыс"]
-    }
-    
-    category_scores = {}
-    
-    for category, words in keywords.items():
-        score = sum(1 for word in words if word in text_lower)
-        category_scores[category] = score
+def _category_from_hits(rules: Rules, hits: Counter) -> str:
+    category_scores = {category: hits[("category", category)] for category in rules.category_keywords}
     
     if not any(category_scores.values()):
         return "Other"
     
     return max(category_scores, key=lambda k: category_scores[k])
 
-def classify_priority(text: str) -> str:
-    """Classify request priority"""
-    text_lower = text.lower()
-    
-    # Critical indicators
-    critical_words = ["срочно", "критично", "не работает", "сломал", "авария", "шұғыл", "жұмыс істемейді", "апат"]
-    if any(word in text_lower for word in critical_words):
-        return "critical"
-    
-    # High priority
-    high_words = ["важно", "проблема", "ошибка", "маңызды", "мәселе", "қате", "помогите", "көмектесіңіз"]
-    if any(word in text_lower for word in high_words):
-        return "high"
-    
-    # Low priority
-    low_words = ["вопрос", "как", "можно", "сұрақ", "қалай", "болады ма"]
-    if any(word in text_lower for word in low_words):
-        return "low"
+def _priority_from_hits(rules: Rules, hits: Counter) -> str:
+    for priority in rules.priority_keywords:
+        if hits[("priority", priority)]:
+            return priority
     
     return "medium"
 
+def classify_category(text: str) -> str:
+    """Classify request category based on keywords"""
+    rules = get_rules()
+    return _category_from_hits(rules, rules.matcher.count(text))
+
+def classify_priority(text: str) -> str:
+    """Classify request priority"""
+    rules = get_rules()
+    return _priority_from_hits(rules, rules.matcher.count(text))
+
+def classify(text: str) -> Tuple[str, str]:
+    """Classify category and priority with a single pass over the text"""
+    rules = get_rules()
+    hits = rules.matcher.count(text)
+    return _category_from_hits(rules, hits), _priority_from_hits(rules, hits)
+
 def route_department(category: str) -> str:
     """Route ticket to appropriate department"""
     return DEPARTMENT_MAPPING.get(category, "General Support")
@@ -91,10 +104,8 @@ def can_auto_resolve(similarity_score: float) -> bool:
     """Decide if ticket can be auto-resolved based on FAQ similarity"""
     return similarity_score >= AUTO_RESOLVE_THRESHOLD
 
-async def generate_summary(text: str) -> str:
-    """Generate summary of the request"""
-    # In production, use LLM
-    # For MVP - simple truncation
+def truncate_summary(text: str) -> str:
+    """Summary without the LLM: the first 15 words"""
     words = text.split()
     if len(words) <= 15:
         return text
@@ -102,21 +113,30 @@ async def generate_summary(text: str) -> str:
     summary = ' '.join(words[:15]) + "..."
     return summary
 
+async def generate_summary(text: str) -> str:
+    """Generate summary of the request, truncation when the LLM is off or failing"""
+    if llm_generation_enabled():
+        try:
+            return await cached_llm("summary", SUMMARY_PROMPT.format(text=text))
+        except LLMError as e:
+            logger.warning("LLM summary failed, using truncation: %s", e)
+    
+    # For MVP - simple truncation
+    return truncate_summary(text)
+
 async def generate_suggested_reply(text: str, category: str, faq_answer: str | None = None) -> str:
-    """Generate suggested reply for operator"""
+    """Generate suggested reply for operator, the rules template when the LLM is off or failing"""
     if faq_answer:
         return faq_answer
     
-    # Template-based responses for MVP
-    templates = {
-        "VPN": "Здравствуйте! Для решения вашего вопроса с VPN, пожалуйста, попробуйте следующее: проверьте подключение к интернету, перезапустите VPN-клиент. Если проблема сохраняется, сообщите нам.",
-        "Email": "Добрый день! Мы получили ваш запрос по электронной почте. Проверьте, пожалуйста, настройки Outlook и попробуйте перезапустить приложение.",
-        "Hardware": "Здравствуйте! Ваш запрос принят. Специалист технической поддержки свяжется с вами в ближайшее время для решения проблемы с оборудованием.",
-        "Software": "Добрый день! Для установки или настройки программного обеспечения, пожалуйста, уточните версию ОС и название программы. Мы поможем вам в ближайшее время.",
-        "Access": "Здравствуйте! Ваш запрос на предоставление доступа принят. После согласования с руководителем мы настроим необходимые права.",
-        "Network": "Добрый день! Проверьте подключение к сети, перезагрузите роутер. Если проблема не решена, мы направим специалиста.",
-        "Other": "Здравствуйте! Ваше обращение принято. Мы рассмотрим его и свяжемся с вами в ближайшее время."
-    }
+    if llm_generation_enabled():
+        try:
+            return await cached_llm("suggested_reply", REPLY_PROMPT.format(category=category, text=text))
+        except LLMError as e:
+            logger.warning("LLM reply failed, using the template: %s", e)
+    
+    # Template-based responses for MVP (rules.json)
+    templates = get_rules().reply_templates
     
     return templates.get(category, templates["Other"])
 
@@ -133,14 +153,8 @@ def translate_to_kz(text: str) -> str:
     Translate Russian to Kazakh
     Placeholder - in production use translation API
     """
-    # Simple keyword replacement for demo
-    translations = {
-        "Здравствуйте": "Сәлеметсіз бе",
-        "Добрый день": "Қайырлы күн",
-        "Ваш запрос принят": "Сіздің сұранысыңыз қабылданды",
-        "Спасибо": "Рақмет",
-        "До свидания": "Сау болыңыз"
-    }
+    # Simple keyword replacement for demo (rules.json)
+    translations = get_rules().kz_translations
     
     result = text
     for ru, kz in translations.items():
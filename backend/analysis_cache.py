@@ -0,0 +1,111 @@
+"""
+LRU/TTL cache for the analysis stage of the ingest pipeline
+
+Identical complaints arrive over and over, so the result of language
+detection, classification and summary is cached per text. That key is the
+text itself: keywords are matched as substrings that may contain hyphens
+and spaces ("вай-фай", "не работает"), so dropping punctuation or
+whitespace could change the classification, and the cached summary is
+written in the sender's wording.
+
+The FAQ search, the expensive part, only sees the faq_store token sequence
+of the Russian text, so its result is cached separately per language and
+token sequence (FAQ_CACHE): near-identical texts that differ in case,
+punctuation or spacing share one FAQ match.
+
+Every entry belongs to a generation, the pair (rules generation, FAQ
+generation). When either changes the whole cache is dropped, and results
+computed under the old generation are not stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from config import ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL
+from faq_store import get_faq_generation, tokenize
+from rules import get_rules
+
+def faq_key(language: str, text_ru: str) -> Tuple[str, Tuple[str, ...]]:
+    """Everything the FAQ search depends on besides the FAQ itself"""
+    return language, tuple(tokenize(text_ru))
+
+def current_generation() -> Tuple[int, int]:
+    return get_rules().generation, get_faq_generation()
+
+class AnalysisCache:
+    """Bounded LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_SIZE, ttl: float = ANALYSIS_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict]]" = OrderedDict()
+        self._generation: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _check_generation(self, generation: Tuple[int, int]) -> None:
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: Hashable, generation: Tuple[int, int]) -> Optional[Dict]:
+        """Cached value for key, or None; the value must not be modified"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Dict, generation: Tuple[int, int]) -> None:
+        """Store a value computed under generation, dropped if rules or FAQ changed meanwhile"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_generation(current_generation())
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+ANALYSIS_CACHE = AnalysisCache()
+FAQ_CACHE = AnalysisCache()
@@ -0,0 +1,68 @@
+"""
+Deferred enrichment benchmark
+
+Starts the LLM stub and the backend with LLM_GENERATION enabled, then
+sends ingest requests with inline enrichment (summary and suggested reply
+generated before the response) and with DEFERRED_ENRICHMENT (generated
+by background workers). Reports ingest latency and, for the deferred
+mode, the time until every ticket is enriched.
+
+Run from backend/:
+    python -m benchmarks.bench_enrichment --requests 100 --llm-latency-ms 500
+"""
+
+import argparse
+import time
+
+import requests
+
+from benchmarks.common import run_server, summarize
+
+MESSAGES = [
+    "Принтер в кабинете 5 не печатает уже второй день",
+    "Нужна установка новой версии 1С на рабочий компьютер",
+    "Пропадает интернет каждые 10 минут",
+    "Не приходят письма от внешних адресатов",
+]
+
+
+def run(label: str, env: dict, count: int) -> None:
+    with run_server(env=env) as base_url, requests.Session() as session:
+        latencies = []
+        start = time.perf_counter()
+        ids = []
+        for i in range(count):
+            sent = time.perf_counter()
+            response = session.post(f"{base_url}/api/ingest", json={"text": f"{MESSAGES[i % len(MESSAGES)]} #{i}"}, timeout=60)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - sent)
+            ids.append(response.json()["ticket_id"])
+        print(summarize(label, latencies, time.perf_counter() - start))
+
+        while session.get(f"{base_url}/api/metrics/runtime", timeout=10).json()["enrichment"]["pending"]:
+            time.sleep(0.05)
+        enriched = sum(session.get(f"{base_url}/api/tickets/{i}", timeout=10).json()["enriched"] for i in ids)
+        print(f"  all enriched after {time.perf_counter() - start:6.2f} s ({enriched}/{count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0)
+    parser.add_argument("--workers", type=int, default=8, help="enrichment workers")
+    args = parser.parse_args()
+
+    with run_server(env={"LLM_STUB_LATENCY_MS": str(args.llm_latency_ms)}, app="benchmarks.llm_stub:app") as stub_url:
+        env = {
+            "OPENAI_API_KEY": "bench",
+            "LLM_BASE_URL": f"{stub_url}/v1",
+            "LLM_GENERATION": "true",
+            "ENRICHMENT_WORKERS": str(args.workers),
+        }
+        print(f"{args.requests} requests, LLM latency {args.llm_latency_ms:.0f} ms")
+        run("inline", {**env, "DEFERRED_ENRICHMENT": "false"}, args.requests)
+        run("deferred", {**env, "DEFERRED_ENRICHMENT": "true"}, args.requests)
+
+
+if __name__ == "__main__":
+    main()
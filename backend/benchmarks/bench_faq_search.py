@@ -0,0 +1,81 @@
+"""
+FAQ search benchmark
+
+Compares the linear cosine_similarity scan, the inverted FaqIndex and the
+TF-IDF sparse matrix scorer on a synthetic knowledge base.
+
+Run from backend/:
+    python -m benchmarks.bench_faq_search --entries 10000 --queries 500
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+import faq_store
+from faq_store import FaqIndex, TfidfFaqIndex, cosine_similarity
+
+
+def make_entries(n: int, rng: random.Random):
+    """
+    Generate n FAQ entries: the vocabulary of the real FAQ plus synthetic
+    terms, sampled with Zipf-like frequencies as in natural text
+    """
+    words = " ".join(item["q"] + " " + item["a"] for item in faq_store.FAQ).split()
+    words += [f"term{i}" for i in range(max(1000, n * 2))]
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+
+    def sample(k):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=k))
+
+    entries = []
+    for _ in range(n):
+        entries.append({"q": sample(rng.randint(3, 8)), "a": sample(rng.randint(15, 40))})
+    return entries, sample
+
+
+def linear_search(entries, text):
+    best_score = 0.0
+    for item in entries:
+        score = max(cosine_similarity(text, item["q"]), cosine_similarity(text, item["a"]) * 0.5)
+        if score > best_score:
+            best_score = score
+    return best_score
+
+
+def timed(label, fn, n_queries):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / n_queries * 1e6:10.1f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--linear-queries", type=int, default=20, help="queries for the slow linear scan")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    entries, sample = make_entries(args.entries, rng)
+    queries = [sample(rng.randint(3, 10)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    inverted = FaqIndex(entries)
+    print(f"FaqIndex build:      {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    tfidf = TfidfFaqIndex(entries)
+    print(f"TfidfFaqIndex build: {time.perf_counter() - start:.3f} s ({len(tfidf.vocab)} terms)")
+    print(f"\n{args.entries} entries, {args.queries} queries")
+
+    linear_queries = queries[:args.linear_queries]
+    timed("linear scan", lambda: [linear_search(entries, q) for q in linear_queries], len(linear_queries))
+    timed("FaqIndex.search", lambda: [inverted.search(q) for q in queries], len(queries))
+    timed("TfidfFaqIndex.search", lambda: [tfidf.search(q) for q in queries], len(queries))
+    timed("TfidfFaqIndex.search_batch", lambda: tfidf.search_batch(queries), len(queries))
+
+
+if __name__ == "__main__":
+    main()
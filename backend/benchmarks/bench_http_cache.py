@@ -0,0 +1,83 @@
+"""
+Conditional GET benchmark
+
+Fills a fresh backend with tickets, then polls GET /api/tickets, a single
+ticket and /api/metrics the way the operator panel does: once without
+validators (every poll downloads and serialises the full response) and
+once sending the ETag of the previous response back in If-None-Match (an
+unchanged resource is answered 304 with an empty body). Reports requests
+per second, bytes received and the CPU time used by the server.
+
+Run from backend/:
+    python -m benchmarks.bench_http_cache --tickets 2000 --polls 500
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import cpu_seconds, run_server_process, summarize
+
+BATCH = 500
+
+
+def fill(session: requests.Session, base_url: str, count: int) -> None:
+    for offset in range(0, count, BATCH):
+        batch = [{"text": f"Не работает VPN на ноутбуке #{i}"} for i in range(offset, min(count, offset + BATCH))]
+        session.post(f"{base_url}/api/ingest/batch", json=batch, timeout=300).raise_for_status()
+
+
+def poll(base_url: str, path: str, count: int, concurrency: int, conditional: bool):
+    """Latencies, statuses and body bytes of count GETs of one path"""
+    etag = None
+    if conditional:
+        etag = requests.get(base_url + path, timeout=60).headers["ETag"]
+    headers = {"If-None-Match": etag} if etag else {}
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+
+        def send(_):
+            sent = time.perf_counter()
+            response = session.get(base_url + path, headers=headers, timeout=60)
+            response.raise_for_status()
+            return time.perf_counter() - sent, response.status_code, len(response.content)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(send, range(count)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=500, help="GETs per path and mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with run_server_process() as (base_url, proc), requests.Session() as session:
+        fill(session, base_url, args.tickets)
+        ticket_id = session.get(f"{base_url}/api/tickets", params={"limit": 1}, timeout=60).json()[0]["id"]
+        print(f"{args.tickets} tickets, {args.polls} polls per path, concurrency {args.concurrency}")
+
+        for path in ["/api/tickets", f"/api/tickets/{ticket_id}", "/api/metrics"]:
+            print(path)
+            for conditional in (False, True):
+                cpu_before = cpu_seconds(proc.pid)
+                start = time.perf_counter()
+                results = poll(base_url, path, args.polls, args.concurrency, conditional)
+                elapsed = time.perf_counter() - start
+                cpu_after = cpu_seconds(proc.pid)
+
+                label = "If-None-Match" if conditional else "full"
+                not_modified = sum(status == 304 for _, status, _ in results)
+                received = sum(size for _, _, size in results)
+                cpu = f"{cpu_after - cpu_before:6.2f} s" if cpu_before is not None else "n/a"
+                print(summarize(f"  {label}", [latency for latency, _, _ in results], elapsed))
+                print(f"    {not_modified} x 304, {received / 1024:9.1f} KiB received, server CPU {cpu}")
+
+
+if __name__ == "__main__":
+    main()
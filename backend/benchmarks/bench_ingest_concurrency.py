@@ -0,0 +1,78 @@
+"""
+Concurrent /api/ingest load benchmark
+
+Starts the backend on a scratch database and fires the same number of
+ingest requests at increasing concurrency. With the async DB layer the
+worker keeps serving while commits are in flight, so throughput holds up
+to the worker's CPU limit as concurrency grows. With the old sync
+Session the event loop blocks on every commit and, once more requests are
+in flight than the connection pool holds, the worker stalls until the
+pool checkout times out.
+
+Run from backend/:
+    python -m benchmarks.bench_ingest_concurrency --requests 400 --concurrency 1 4 16 64
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import run_server, summarize
+
+MESSAGES = [
+    "Не работает почта Outlook",
+    "VPN не подключается, срочно нужна помощь",
+    "Как получить доступ к общей папке?",
+    "Принтер печатает пустые листы",
+    "Интернет пропадает каждые 10 минут",
+    "Outlook поштасы жұмыс істемейді",
+]
+
+_local = threading.local()
+
+
+def post_ingest(base_url: str, i: int) -> float:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    start = time.perf_counter()
+    response = session.post(
+        f"{base_url}/api/ingest",
+        json={"text": MESSAGES[i % len(MESSAGES)], "subject": f"bench {i}"},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--url", help="benchmark an already running backend instead")
+    args = parser.parse_args()
+
+    def run(base_url):
+        # Warm up the server and the connection pool
+        for i in range(10):
+            post_ingest(base_url, i)
+        for concurrency in args.concurrency:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                start = time.perf_counter()
+                latencies = list(pool.map(lambda i: post_ingest(base_url, i), range(args.requests)))
+                elapsed = time.perf_counter() - start
+            print(summarize(f"concurrency={concurrency}", latencies, elapsed))
+
+    if args.url:
+        run(args.url)
+    else:
+        with run_server(workers=args.workers) as base_url:
+            run(base_url)
+
+
+if __name__ == "__main__":
+    main()
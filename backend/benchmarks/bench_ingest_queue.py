@@ -0,0 +1,70 @@
+"""
+Durable ingest queue benchmark
+
+Sends a burst of concurrent /api/ingest requests to the backend with the
+ingest queue disabled (every request runs the pipeline in its handler)
+and with INGEST_QUEUE enabled (requests are appended to the queue table
+and drained in batches). Reports response latency, how many requests were
+answered 202 (still queued after INGEST_QUEUE_WAIT) and the time until
+the queue is empty.
+
+Run from backend/:
+    python -m benchmarks.bench_ingest_queue --requests 500 --concurrency 64
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import run_server, summarize
+
+MESSAGES = [
+    "Принтер в кабинете 5 не печатает уже второй день",
+    "Нужна установка новой версии 1С на рабочий компьютер",
+    "Пропадает интернет каждые 10 минут",
+    "Не приходят письма от внешних адресатов",
+]
+
+
+def run(label: str, env: dict, count: int, concurrency: int) -> None:
+    with run_server(env=env) as base_url, requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+
+        def send(i: int):
+            sent = time.perf_counter()
+            response = session.post(f"{base_url}/api/ingest", json={"text": f"{MESSAGES[i % len(MESSAGES)]} #{i}"}, timeout=120)
+            response.raise_for_status()
+            return time.perf_counter() - sent, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(send, range(count)))
+        print(summarize(label, [latency for latency, _ in results], time.perf_counter() - start))
+
+        queued = sum(status == 202 for _, status in results)
+        if queued:
+            while True:
+                stats = session.get(f"{base_url}/api/metrics/runtime", timeout=10).json()["ingest_queue"]
+                if not stats["pending"] and not stats["processing"]:
+                    break
+                time.sleep(0.05)
+            print(f"  {queued} answered 202, queue drained after {time.perf_counter() - start:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--wait", type=float, default=5.0, help="INGEST_QUEUE_WAIT in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    run("direct", {"INGEST_QUEUE": "false"}, args.requests, args.concurrency)
+    run("queued", {"INGEST_QUEUE": "true", "INGEST_QUEUE_WAIT": str(args.wait)}, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Keyword classification benchmark
+
+Compares the per-keyword `word in text` scan with the compiled
+KeywordMatcher automaton as the keyword lists grow.
+
+Run from backend/:
+    python -m benchmarks.bench_keyword_matcher --sizes 50 500 5000
+"""
+
+import argparse
+import random
+import time
+
+from rules import get_rules
+from keyword_matcher import KeywordMatcher
+
+TEXTS = [
+    "Не работает почта Outlook, срочно помогите",
+    "VPN не подключается с домашнего компьютера, проблема с сетью",
+    "Как получить доступ к общей папке отдела?",
+    "Принтер на третьем этаже печатает пустые листы уже второй день, "
+    "перезагрузка не помогла, драйверы переустанавливали",
+    "Outlook поштасы жұмыс істемейді, көмектесіңіз",
+]
+
+
+def make_groups(size: int, rng: random.Random):
+    """Real keyword lists padded with synthetic stems up to `size` keywords"""
+    rules = get_rules()
+    groups = {name: list(words) for name, words in {**rules.category_keywords, **rules.priority_keywords}.items()}
+    alphabet = "абвгдежзиклмнопрстуфхцчшыэюяәғқңөұүі"
+    names = list(groups)
+    while sum(len(words) for words in groups.values()) < size:
+        stem = "".join(rng.choice(alphabet) for _ in range(rng.randint(4, 9)))
+        groups[rng.choice(names)].append(stem)
+    return groups
+
+
+def scan(groups, text):
+    text_lower = text.lower()
+    return {name: sum(1 for word in words if word in text_lower) for name, words in groups.items()}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in TEXTS:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(TEXTS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'keywords':>8} {'substring scan':>16} {'automaton':>12} {'build':>10}")
+    for size in args.sizes:
+        groups = make_groups(size, rng)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(groups)
+        build = time.perf_counter() - start
+        scan_us = timed(lambda text: scan(groups, text), args.repeat)
+        matcher_us = timed(matcher.count, args.repeat)
+        print(f"{len(matcher):>8} {scan_us:>13.1f} us {matcher_us:>9.1f} us {build * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
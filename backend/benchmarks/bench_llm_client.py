@@ -0,0 +1,121 @@
+"""
+LLM client benchmark against the local OpenAI-compatible stub
+
+Sends a workload of prompts, a share of them duplicates of each other,
+at a fixed concurrency to benchmarks/llm_stub.py. Compared:
+
+- naive: a new HTTP client per call, no concurrency cap, no coalescing
+- LLMClient: pooled connections, semaphore cap, coalescing of identical
+  in-flight prompts
+
+Reports throughput, latency percentiles, upstream calls and the peak
+number of calls the stub saw in flight. A last run rejects the first API
+key at the stub to show failover to the second one.
+
+Run from backend/:
+    python -m benchmarks.bench_llm_client --prompts 500 --concurrency 64 --latency-ms 100
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import requests
+
+from benchmarks.common import percentile, run_server
+from llm_client import LLMClient
+
+KEYS = ["key-a", "key-b"]
+
+
+def make_prompts(count: int, duplicate_share: float, seed: int = 0):
+    rng = random.Random(seed)
+    popular = [f"Кратко опиши обращение: не работает почта Outlook #{i}" for i in range(5)]
+    return [
+        rng.choice(popular) if rng.random() < duplicate_share else f"Кратко опиши обращение #{i}"
+        for i in range(count)
+    ]
+
+
+async def naive_complete(base_url: str, prompt: str) -> str:
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(
+            f"{base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {KEYS[0]}"},
+            json={"model": "stub", "messages": [{"role": "user", "content": prompt}]},
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def drive(complete, prompts, concurrency: int):
+    latencies = []
+    queue = iter(prompts)
+
+    async def worker():
+        for prompt in queue:
+            start = time.perf_counter()
+            await complete(prompt)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def report(label: str, stub_url: str, latencies, elapsed: float) -> None:
+    stats = requests.get(f"{stub_url}/stats", timeout=5).json()
+    requests.post(f"{stub_url}/stats/reset", timeout=5)
+    print(
+        f"{label:<22} {len(latencies) / elapsed:8.1f} prompts/s"
+        f"   p50 {percentile(latencies, 50) * 1000:7.1f} ms"
+        f"   p95 {percentile(latencies, 95) * 1000:7.1f} ms"
+        f"   p99 {percentile(latencies, 99) * 1000:7.1f} ms"
+        f"   upstream {stats['calls']:>5}   peak in flight {stats['peak_in_flight']:>4}"
+    )
+
+
+async def run_all(args, stub_url: str, api_url: str) -> None:
+    prompts = make_prompts(args.prompts, args.duplicates)
+
+    latencies, elapsed = await drive(lambda p: naive_complete(api_url, p), prompts, args.concurrency)
+    report("naive", stub_url, latencies, elapsed)
+
+    client = LLMClient(KEYS, model="stub", base_url=api_url, max_concurrency=args.max_concurrency)
+    latencies, elapsed = await drive(client.complete, prompts, args.concurrency)
+    report(f"LLMClient (cap {args.max_concurrency})", stub_url, latencies, elapsed)
+    print(f"  client stats {client.stats()}")
+    await client.close()
+
+
+async def run_failover(args, stub_url: str, api_url: str) -> None:
+    client = LLMClient(KEYS, model="stub", base_url=api_url, max_concurrency=args.max_concurrency)
+    prompts = make_prompts(args.prompts // 5, 0.0, seed=1)
+    latencies, elapsed = await drive(client.complete, prompts, args.concurrency)
+    report("failover (key-a 401)", stub_url, latencies, elapsed)
+    print(f"  client stats {client.stats()}")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64, help="callers issuing prompts at once")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="LLMClient in-flight cap")
+    parser.add_argument("--duplicates", type=float, default=0.3, help="share of prompts repeating a popular one")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    env = {"LLM_STUB_LATENCY_MS": str(args.latency_ms), "LLM_STUB_JITTER_MS": str(args.latency_ms / 5)}
+    print(f"{args.prompts} prompts, {args.duplicates:.0%} duplicates, "
+          f"{args.concurrency} callers, stub latency {args.latency_ms:.0f} ms")
+    with run_server(env=env, app="benchmarks.llm_stub:app") as stub_url:
+        asyncio.run(run_all(args, stub_url, f"{stub_url}/v1"))
+    with run_server(env={**env, "LLM_STUB_KEYS": KEYS[1]}, app="benchmarks.llm_stub:app") as stub_url:
+        asyncio.run(run_failover(args, stub_url, f"{stub_url}/v1"))
+
+
+if __name__ == "__main__":
+    main()
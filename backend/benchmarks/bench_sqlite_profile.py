@@ -0,0 +1,130 @@
+"""
+SQLite engine profile benchmark: mixed read/write load
+
+Fills a scratch database per profile and runs writer threads (one ticket
+plus its counter upsert per transaction, like /api/ingest) next to reader
+threads (the newest-tickets page and a status breakdown, like
+/api/tickets and /api/metrics) for a fixed time. Compared are the SQLite
+defaults (rollback journal, synchronous=FULL, no mmap, 2 MiB page cache,
+pool of 5) and the tuned profile from config.py (WAL, synchronous=NORMAL,
+mmap, 64 MiB page cache, larger pool). In rollback-journal mode every
+commit locks out the readers and waits for fsync; in WAL mode readers
+keep reading the last snapshot while the writer appends.
+
+Run from backend/:
+    python -m benchmarks.bench_sqlite_profile --seconds 10 --writers 4 --readers 8
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.bench_ticket_queries import fill
+from benchmarks.common import summarize
+from database import configure_engine, pool_options, sqlite_pragmas
+from models import Base, Ticket, TicketStat
+
+PROFILES = {
+    "default": {
+        "pragmas": {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000, "mmap_size": 0, "cache_size": -2000},
+        "pool": {"pool_size": 5, "max_overflow": 10},
+    },
+    "tuned": {"pragmas": sqlite_pragmas(), "pool": pool_options()},
+}
+
+
+def write(conn, i: int) -> None:
+    conn.execute(Ticket.__table__.insert(), {
+        "subject": f"Write {i}",
+        "body": "Принтер печатает пустые листы",
+        "language": "ru",
+        "category": "Hardware",
+        "priority": "medium",
+        "department": "IT Support",
+        "status": "new",
+    })
+    stmt = insert(TicketStat).values([
+        {"dimension": "total", "value": "", "count": 1},
+        {"dimension": "status", "value": "new", "count": 1},
+    ])
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[TicketStat.dimension, TicketStat.value],
+        set_={"count": TicketStat.count + stmt.excluded.count}
+    ))
+
+
+def read(conn, i: int) -> None:
+    if i % 4:
+        conn.execute(select(Ticket).order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(50)).fetchall()
+    else:
+        conn.execute(select(Ticket.status, func.count(Ticket.id)).group_by(Ticket.status)).fetchall()
+
+
+def run(name: str, rows: int, seconds: float, writers: int, readers: int) -> None:
+    profile = PROFILES[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            **profile["pool"]
+        )
+        configure_engine(engine, profile["pragmas"])
+        Base.metadata.create_all(bind=engine)
+        fill(engine, rows)
+
+        latencies = {"write": [], "read": []}
+        errors: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+
+        def worker(kind: str, index: int):
+            i = index
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        (write if kind == "write" else read)(conn, i)
+                except OperationalError:
+                    errors[kind] += 1
+                    continue
+                latencies[kind].append(time.perf_counter() - start)
+                i += 1
+
+        threads = [threading.Thread(target=worker, args=("write", i)) for i in range(writers)]
+        threads += [threading.Thread(target=worker, args=("read", i)) for i in range(readers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+
+    for kind, values in latencies.items():
+        print(summarize(f"{name} {kind}", values, elapsed))
+    if errors:
+        print(f"  database is locked: {dict(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=50_000, help="tickets in the database before the run")
+    parser.add_argument("--profile", choices=sorted(PROFILES), nargs="+", default=["default", "tuned"])
+    args = parser.parse_args()
+
+    print(f"{args.rows} tickets, {args.writers} writers, {args.readers} readers, {args.seconds:.0f} s")
+    for name in args.profile:
+        run(name, args.rows, args.seconds, args.writers, args.readers)
+
+
+if __name__ == "__main__":
+    main()
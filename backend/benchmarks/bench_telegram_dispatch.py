@@ -0,0 +1,97 @@
+"""
+Telegram bot update dispatch benchmark
+
+Feeds a burst of updates from many chats through UpdateDispatcher with
+handle_update as the handler, against local stub servers for the Telegram
+API and the backend. The backend stub sleeps per ingest call to emulate
+the classification pipeline. Reports throughput per worker count and
+checks that every chat's messages were processed in order and that the
+committed offset covers the whole burst.
+
+Run from backend/:
+    python -m benchmarks.bench_telegram_dispatch --updates 1000 --chats 100 --ingest-ms 20
+"""
+
+import argparse
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+import telegram_bot
+from benchmarks.bench_telegram_http import StubServer
+
+
+def make_updates(count: int, chats: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            "update_id": 1000 + i,
+            "message": {
+                "chat": {"id": rng.randrange(chats) + 1},
+                "from": {"first_name": "Bench"},
+                "text": f"Не работает почта {i}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def run(updates, workers: int) -> None:
+    processed = defaultdict(list)
+    lock = threading.Lock()
+
+    def handler(update):
+        telegram_bot.handle_update(update)
+        with lock:
+            processed[update["message"]["chat"]["id"]].append(update["update_id"])
+
+    dispatcher = telegram_bot.UpdateDispatcher(handler, workers=workers,
+                                               offset=updates[0]["update_id"])
+    start = time.perf_counter()
+    for update in updates:
+        dispatcher.submit(update)
+    dispatcher.join()
+    elapsed = time.perf_counter() - start
+    dispatcher.shutdown()
+
+    in_order = all(ids == sorted(ids) for ids in processed.values())
+    complete = dispatcher.offset == updates[-1]["update_id"] + 1
+    print(
+        f"workers {workers:>3}   {elapsed:6.2f} s   {len(updates) / elapsed:8.1f} updates/s"
+        f"   per-chat order {'ok' if in_order else 'BROKEN'}"
+        f"   offset {'ok' if complete else 'BEHIND'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--ingest-ms", type=float, default=20.0,
+                        help="backend processing time per message")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    logging.getLogger(telegram_bot.__name__).setLevel(logging.WARNING)
+    telegram_stub = StubServer(0.0)
+    backend_stub = StubServer(0.0, response_delay=args.ingest_ms / 1000)
+    for server in (telegram_stub, backend_stub):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    telegram_bot.TELEGRAM_API_URL = f"{telegram_stub.url}/botTOKEN"
+    telegram_bot.BACKEND_URL = backend_stub.url
+    telegram_bot.http_session = telegram_bot.create_http_session(max(args.workers))
+
+    updates = make_updates(args.updates, args.chats)
+    print(f"{args.updates} updates from {args.chats} chats, {args.ingest_ms:.0f} ms per ingest call")
+    for workers in args.workers:
+        run(updates, workers)
+
+    for server in (telegram_stub, backend_stub):
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Telegram bot outbound HTTP benchmark
+
+Runs process_user_message against local stub servers for the Telegram API
+and the backend, once with bare requests.post/get calls (a new connection
+per call) and once with the bot's pooled keep-alive session. The stubs can
+delay every new connection to emulate the TCP + TLS handshake with a
+remote host.
+
+Run from backend/:
+    python -m benchmarks.bench_telegram_http --messages 200 --handshake-ms 20
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import telegram_bot
+from benchmarks.common import free_port
+
+INGEST_RESPONSE = {
+    "status": "new",
+    "ticket_id": 1,
+    "category": "Email",
+    "priority": "high",
+    "department": "IT Support",
+    "summary": "stub",
+    "language": "ru",
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handshake_delay: float, response_delay: float = 0.0):
+        super().__init__(("127.0.0.1", free_port()), StubHandler)
+        self.handshake_delay = handshake_delay
+        # Processing time of every request, e.g. the backend's ingest pipeline
+        self.response_delay = response_delay
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle + delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_delay)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.response_delay:
+            time.sleep(self.server.response_delay)
+        body = INGEST_RESPONSE if self.path == "/api/ingest" else {"ok": True, "result": {}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label: str, client, messages: int, servers) -> None:
+    telegram_bot.http_session = client
+    for server in servers:
+        server.connections = 0
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        telegram_bot.process_user_message(f"Не работает почта {i}", chat_id=1)
+        latencies.append(time.perf_counter() - start)
+    connections = sum(server.connections for server in servers)
+    latencies.sort()
+    print(
+        f"{label:<18} mean {sum(latencies) / messages * 1000:7.2f} ms"
+        f"   p95 {latencies[int(messages * 0.95)] * 1000:7.2f} ms"
+        f"   connections opened {connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=20.0,
+                        help="delay per new connection, emulates TCP + TLS setup")
+    args = parser.parse_args()
+
+    logging.getLogger(telegram_bot.__name__).setLevel(logging.WARNING)
+    servers = [StubServer(args.handshake_ms / 1000) for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    telegram_stub, backend_stub = servers
+    telegram_bot.TELEGRAM_API_URL = f"{telegram_stub.url}/botTOKEN"
+    telegram_bot.BACKEND_URL = backend_stub.url
+
+    print(f"{args.messages} messages, {args.handshake_ms:.0f} ms per new connection")
+    run("bare requests", requests, args.messages, servers)
+    run("pooled session", telegram_bot.create_http_session(), args.messages, servers)
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Telegram bot ingest mode benchmark: remote vs local
+
+Runs process_user_message for the same messages with INGEST_MODE=remote
+(POST to a backend started with uvicorn) and INGEST_MODE=local (the
+pipeline called inside the bot process through LocalIngest). Telegram
+API calls go to a local stub, so the difference is the HTTP round trip
+and the JSON encode/decode on both sides.
+
+Run from backend/:
+    python -m benchmarks.bench_telegram_ingest --messages 300
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import telegram_bot
+from benchmarks.bench_telegram_http import StubServer
+from benchmarks.common import run_server, summarize
+
+TEXTS = [
+    "Не работает VPN, срочно",
+    "Как сбросить пароль от почты?",
+    "Сломался принтер в кабинете",
+    "Нужен доступ к папке отдела",
+]
+
+
+def run(label: str, messages: int) -> None:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(messages):
+        sent = time.perf_counter()
+        ok = telegram_bot.process_user_message(f"{TEXTS[i % len(TEXTS)]} #{i}", chat_id=1)
+        latencies.append(time.perf_counter() - sent)
+        assert ok, f"{label}: message {i} failed"
+    print(summarize(label, latencies, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300)
+    args = parser.parse_args()
+
+    logging.getLogger(telegram_bot.__name__).setLevel(logging.WARNING)
+    telegram_stub = StubServer(0.0)
+    threading.Thread(target=telegram_stub.serve_forever, daemon=True).start()
+    telegram_bot.TELEGRAM_API_URL = f"{telegram_stub.url}/botTOKEN"
+
+    with run_server(env={"RULES_RELOAD_INTERVAL": "0"}) as base_url:
+        telegram_bot.INGEST_MODE = "remote"
+        telegram_bot.BACKEND_URL = base_url
+        run("remote (HTTP)", args.messages)
+
+    # The local pipeline opens ./helpdesk.db, keep it out of the source tree
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        telegram_bot.INGEST_MODE = "local"
+        telegram_bot.get_local_ingest()
+        run("local (in-process)", args.messages)
+        telegram_bot.get_local_ingest().close()
+
+    telegram_stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Telegram webhook benchmark with a fake Telegram sender
+
+Starts the backend and pushes updates to /api/telegram/webhook the way
+Telegram does (JSON POST with the secret token header), checking that
+every response carries a sendMessage for the right chat, that a
+redelivered update is ignored and that a wrong secret is rejected. For
+comparison the same messages go through the long-polling path:
+telegram_bot.process_user_message posting to /api/ingest and sending the
+reply to a stub Telegram API.
+
+Run from backend/:
+    python -m benchmarks.bench_telegram_webhook --messages 200
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+import requests
+
+import telegram_bot
+from benchmarks.bench_telegram_http import StubServer
+from benchmarks.common import run_server, summarize
+
+SECRET = "bench-secret"
+TEXTS = [
+    "Не работает VPN, срочно",
+    "Как сбросить пароль от почты?",
+    "Сломался принтер в кабинете",
+    "Нужен доступ к папке отдела",
+]
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "chat": {"id": 1000 + update_id % 50, "type": "private"},
+            "from": {"id": 1000 + update_id % 50, "first_name": "Bench"},
+            "text": f"{TEXTS[update_id % len(TEXTS)]} #{update_id}",
+        },
+    }
+
+
+def run_webhook(session: requests.Session, base_url: str, messages: int) -> None:
+    url = f"{base_url}/api/telegram/webhook"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    latencies = []
+    start = time.perf_counter()
+    for update_id in range(1, messages + 1):
+        update = make_update(update_id)
+        sent = time.perf_counter()
+        reply = session.post(url, json=update, headers=headers, timeout=30)
+        latencies.append(time.perf_counter() - sent)
+        reply.raise_for_status()
+        body = reply.json()
+        assert body.get("method") == "sendMessage", body
+        assert body["chat_id"] == update["message"]["chat"]["id"], body
+    elapsed = time.perf_counter() - start
+    print(summarize("webhook", latencies, elapsed))
+
+    redelivered = session.post(url, json=make_update(1), headers=headers, timeout=30).json()
+    print(f"redelivered update ignored: {redelivered == {}}")
+    rejected = session.post(url, json=make_update(messages + 1),
+                            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}, timeout=30)
+    print(f"wrong secret rejected: {rejected.status_code == 403}")
+
+
+def run_long_polling(base_url: str, messages: int) -> None:
+    telegram_stub = StubServer(0.0)
+    threading.Thread(target=telegram_stub.serve_forever, daemon=True).start()
+    telegram_bot.TELEGRAM_API_URL = f"{telegram_stub.url}/botTOKEN"
+    telegram_bot.BACKEND_URL = base_url
+
+    latencies = []
+    start = time.perf_counter()
+    for update_id in range(1, messages + 1):
+        message = make_update(update_id)["message"]
+        sent = time.perf_counter()
+        telegram_bot.process_user_message(message["text"], message["chat"]["id"])
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    print(summarize("bot -> /api/ingest", latencies, elapsed))
+    telegram_stub.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.getLogger(telegram_bot.__name__).setLevel(logging.WARNING)
+    with run_server(env={"TELEGRAM_WEBHOOK_SECRET": SECRET, "RULES_RELOAD_INTERVAL": "0"}) as base_url:
+        with requests.Session() as session:
+            run_webhook(session, base_url, args.messages)
+        run_long_polling(base_url, args.messages)
+
+
+if __name__ == "__main__":
+    main()
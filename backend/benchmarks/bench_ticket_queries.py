@@ -0,0 +1,122 @@
+"""
+Tickets table query plans and latencies with and without the indexes
+
+Fills a scratch SQLite database with synthetic tickets, then runs the
+queries issued by GET /api/tickets and /api/metrics twice: on the original
+schema (primary key only) and after migrate_db() has added the indexes
+declared on models.Ticket. Prints EXPLAIN QUERY PLAN and the median
+latency of each query.
+
+Run from backend/:
+    python -m benchmarks.bench_ticket_queries --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text, tuple_
+
+from config import CATEGORIES, DEPARTMENT_MAPPING, PRIORITIES
+from models import Base, Ticket
+
+STATUSES = ["new", "in_progress", "closed", "closed_auto"]
+STATUS_WEIGHTS = [5, 3, 40, 52]
+START_TIME = datetime(2024, 1, 1)
+
+
+def queries(rows: int):
+    page = 50
+    # Keyset position in the middle of the table, as sent by a deep "load more"
+    cursor_at = START_TIME + timedelta(seconds=rows // 2 * 30)
+    return {
+        "list newest page": select(Ticket).order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(page),
+        "list cursor page": select(Ticket).where(
+            tuple_(Ticket.created_at, Ticket.id) < tuple_(cursor_at, rows // 2)
+        ).order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(page),
+        "status=new page": select(Ticket).where(Ticket.status == "new")
+            .order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(page),
+        "status=in_progress all": select(Ticket.id).where(Ticket.status == "in_progress")
+            .order_by(Ticket.created_at.desc(), Ticket.id.desc()),
+        "count closed_auto": select(func.count(Ticket.id)).where(Ticket.status == "closed_auto"),
+        "group by category": select(Ticket.category, func.count(Ticket.id)).group_by(Ticket.category),
+        "group by status": select(Ticket.status, func.count(Ticket.id)).group_by(Ticket.status),
+        "group by priority": select(Ticket.priority, func.count(Ticket.id)).group_by(Ticket.priority),
+    }
+
+
+def fill(engine, rows: int, batch: int = 50_000):
+    rng = random.Random(7)
+    table = Ticket.__table__
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            chunk = []
+            for i in range(offset, min(rows, offset + batch)):
+                category = rng.choice(CATEGORIES)
+                created_at = START_TIME + timedelta(seconds=i * 30 + rng.randint(0, 29))
+                chunk.append({
+                    "subject": f"Ticket {i}",
+                    "body": "Текст обращения " * rng.randint(5, 40),
+                    "language": rng.choice(["ru", "kz"]),
+                    "category": category,
+                    "priority": rng.choice(PRIORITIES),
+                    "department": DEPARTMENT_MAPPING[category],
+                    "status": rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                    "summary": f"Ticket {i}",
+                    "suggested_reply": "Здравствуйте! " * rng.randint(5, 20),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            conn.execute(table.insert(), chunk)
+
+
+def run_queries(engine, rows: int, repeat: int):
+    with engine.connect() as conn:
+        for label, stmt in queries(rows).items():
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(stmt).fetchall()
+                timings.append(time.perf_counter() - start)
+            print(f"  {label:<24} {statistics.median(timings) * 1000:10.2f} ms   {' / '.join(plan)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        # Start from the original schema: primary key index only
+        new_indexes = [index for index in Ticket.__table__.indexes if index.name != "ix_tickets_id"]
+        for index in new_indexes:
+            index.drop(bind=engine)
+
+        start = time.perf_counter()
+        fill(engine, args.rows)
+        print(f"Inserted {args.rows} tickets in {time.perf_counter() - start:.1f} s")
+
+        print("\nWithout indexes:")
+        run_queries(engine, args.rows, args.repeat)
+
+        start = time.perf_counter()
+        for index in new_indexes:
+            index.create(bind=engine, checkfirst=True)
+        print(f"\nCreated {len(new_indexes)} indexes in {time.perf_counter() - start:.1f} s")
+
+        print("\nWith indexes:")
+        run_queries(engine, args.rows, args.repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Ticket list serialisation benchmark
+
+Fills a scratch SQLite database with synthetic tickets and builds the
+GET /api/tickets body for all of them two ways:
+
+- orm: select(Ticket) loads ORM objects, which are validated into
+  List[TicketResponse] (from_attributes) and dumped to JSON, as FastAPI
+  does for a response_model
+- core: select() of the TicketResponse columns returns plain tuples,
+  encoded directly with orjson (router_tickets.json_rows)
+
+Checks that both give the same JSON and prints the median time of each.
+
+Run from backend/:
+    python -m benchmarks.bench_ticket_serialization --rows 10000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.bench_ticket_queries import fill
+from models import Base, Ticket, TicketResponse
+from router_tickets import TICKET_FIELDS, json_rows
+
+TICKET_LIST = TypeAdapter(List[TicketResponse])
+
+
+def orm_body(session: Session) -> bytes:
+    tickets = session.scalars(select(Ticket).order_by(Ticket.created_at.desc(), Ticket.id.desc())).all()
+    return TICKET_LIST.dump_json(TICKET_LIST.validate_python(tickets, from_attributes=True))
+
+
+def core_body(session: Session) -> bytes:
+    query = select(*[getattr(Ticket, name) for name in TICKET_FIELDS]).order_by(Ticket.created_at.desc(), Ticket.id.desc())
+    return json_rows(TICKET_FIELDS, session.execute(query).all()).body
+
+
+def measure(engine, build, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        # A fresh session per run, like a request: no identity map carried over
+        with Session(engine) as session:
+            start = time.perf_counter()
+            body = build(session)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        fill(engine, args.rows)
+
+        orm_time, orm_json = measure(engine, orm_body, args.repeat)
+        core_time, core_json = measure(engine, core_body, args.repeat)
+        if json.loads(orm_json) != json.loads(core_json):
+            raise SystemExit("core and orm bodies differ")
+
+        print(f"{args.rows} tickets, {len(core_json) / 1024:.0f} KiB of JSON, median of {args.repeat} runs")
+        print(f"  orm + pydantic  {orm_time * 1000:8.1f} ms")
+        print(f"  core + orjson   {core_time * 1000:8.1f} ms   {orm_time / core_time:4.1f}x faster")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Shared helpers for the HTTP benchmarks"""
+
+import contextlib
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def run_server(env: dict | None = None, workers: int = 1, app: str = "main:app"):
+    """
+    Start the backend (or another app, e.g. benchmarks.llm_stub:app) with
+    uvicorn in a scratch directory, so the benchmark gets its own
+    helpdesk.db, and yield its base URL
+    """
+    with run_server_process(env, workers, app) as (base_url, _):
+        yield base_url
+
+
+@contextlib.contextmanager
+def run_server_process(env: dict | None = None, workers: int = 1, app: str = "main:app"):
+    """Like run_server, but yield the base URL and the uvicorn process"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", app,
+                "--app-dir", BACKEND_DIR,
+                "--port", str(port),
+                "--workers", str(workers),
+                "--log-level", "warning",
+            ],
+            cwd=workdir,
+            env={**os.environ, "PYTHONWARNINGS": "ignore", **(env or {})},
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.time() + 30
+            while True:
+                try:
+                    requests.get(base_url + "/", timeout=1)
+                    break
+                except requests.RequestException:
+                    if time.time() > deadline or proc.poll() is not None:
+                        raise RuntimeError("backend did not start")
+                    time.sleep(0.1)
+            yield base_url, proc
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def cpu_seconds(pid: int) -> float | None:
+    """User plus system CPU time of a process, None where /proc is missing"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name, utime and stime are 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(label: str, latencies, elapsed: float) -> str:
+    """One result line: throughput and latency percentiles in ms"""
+    return (
+        f"{label:<20} {len(latencies) / elapsed:9.1f} req/s"
+        f"   p50 {statistics.median(latencies) * 1000:7.1f} ms"
+        f"   p95 {percentile(latencies, 95) * 1000:7.1f} ms"
+    )
@@ -0,0 +1,99 @@
+"""
+Local OpenAI-compatible stub for offline LLM runs and benchmarks
+
+Serves POST /v1/chat/completions with a configurable latency, optional
+jitter and error rate, and a list of accepted API keys (requests with any
+other key get 401, which exercises key failover). GET /stats reports the
+number of calls and the peak number of calls in flight.
+
+Run from backend/:
+    python -m benchmarks.llm_stub --port 8001 --latency-ms 200
+then start the backend with LLM_BASE_URL=http://127.0.0.1:8001/v1 and
+OPENAI_API_KEY set to any value.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from fastapi import FastAPI, Header, HTTPException
+
+LATENCY = float(os.getenv("LLM_STUB_LATENCY_MS", "200")) / 1000
+JITTER = float(os.getenv("LLM_STUB_JITTER_MS", "0")) / 1000
+ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+# Comma separated accepted keys, empty accepts any key
+KEYS = {key for key in os.getenv("LLM_STUB_KEYS", "").split(",") if key}
+
+app = FastAPI(title="LLM stub")
+counters = {"calls": 0, "rejected": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict, authorization: str = Header("")):
+    counters["calls"] += 1
+    if KEYS and authorization.removeprefix("Bearer ") not in KEYS:
+        counters["rejected"] += 1
+        raise HTTPException(status_code=401, detail="invalid api key")
+
+    counters["in_flight"] += 1
+    counters["peak_in_flight"] = max(counters["peak_in_flight"], counters["in_flight"])
+    try:
+        await asyncio.sleep(max(0.0, LATENCY + random.uniform(-JITTER, JITTER)))
+    finally:
+        counters["in_flight"] -= 1
+
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        counters["errors"] += 1
+        raise HTTPException(status_code=503, detail="overloaded")
+
+    prompt = body["messages"][-1]["content"]
+    return {
+        "id": f"stub-{counters['calls']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": f"stub: {prompt[:100]}"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 1, "total_tokens": len(prompt.split()) + 1},
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for name in counters:
+        counters[name] = 0
+    return counters
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY * 1000)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER * 1000)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--keys", default=",".join(KEYS), help="comma separated accepted API keys")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "LLM_STUB_LATENCY_MS": str(args.latency_ms),
+        "LLM_STUB_JITTER_MS": str(args.jitter_ms),
+        "LLM_STUB_ERROR_RATE": str(args.error_rate),
+        "LLM_STUB_KEYS": args.keys,
+    })
+    uvicorn.run("benchmarks.llm_stub:app", host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,112 @@ import warnings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_KEY2 = os.getenv("OPENAI_API_KEY2")
 API_MODEL = os.getenv("API_MODEL", "gpt-4")
+# OpenAI-compatible endpoint, e.g. http://127.0.0.1:8001/v1 for benchmarks/llm_stub.py
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+# Generate summaries and suggested replies with the LLM (needs OPENAI_API_KEY),
+# otherwise truncation and rules.json templates are used
+LLM_GENERATION = os.getenv("LLM_GENERATION", "false").lower() in ("1", "true", "yes")
+# Model calls in flight per worker
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Seconds per attempt, one attempt per API key
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
 
 if not OPENAI_API_KEY:
     warnings.warn("OPENAI_API_KEY not set. Set it via environment variable or .env before running in production.")
 
 # Database
-DATABASE_URL = "sqlite:///./helpdesk.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./helpdesk.db")
+# Connections kept open per engine and extra ones opened under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds to wait for a free pooled connection
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a server connection (PostgreSQL) is replaced, -1 never
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite pragmas set on every connection. WAL lets readers run next to the
+# writer; synchronous=NORMAL is safe with WAL but may lose the last commits
+# on power loss. SQLITE_JOURNAL_MODE=DELETE and SQLITE_SYNCHRONOUS=FULL
+# restore the SQLite defaults.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Milliseconds a connection waits for a lock before "database is locked"
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+# Bytes of the database file memory-mapped per connection, 0 disables mmap
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache per connection, negative values are KiB (-65536 = 64 MiB)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+# Async driver for the same database (aiosqlite for SQLite, asyncpg for PostgreSQL;
+# psycopg 3 serves both, postgresql+psycopg:// is used as is)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+_scheme, _, _rest = DATABASE_URL.partition("://")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", f"{ASYNC_DRIVERS.get(_scheme, _scheme)}://{_rest}")
+
+# Persistent LLM completion cache, a SQLite file next to the SQLite database
+# (sqlite:///./helpdesk.db -> ./llm_cache.db)
+_db_dir = os.path.dirname(_rest[1:]) if _scheme == "sqlite" else "."
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(_db_dir or ".", "llm_cache.db"))
+# Seconds a cached completion is served, 0 keeps entries until evicted by size
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
 
 # AI Settings
 AUTO_RESOLVE_THRESHOLD = 0.85
 SIMILARITY_THRESHOLD = 0.7
+# FAQ scorer: "overlap" (token set cosine) or "tfidf" (TF-IDF sparse matrix)
+FAQ_SCORER = os.getenv("FAQ_SCORER", "overlap")
+
+# Analysis cache (language, classification, summary) per text and FAQ match per
+# token sequence, both with these limits
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "10000"))
+# Seconds an entry stays valid, 0 disables the cache
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "600"))
+
+# Classification rules (keywords, reply templates, phrase table)
+RULES_PATH = os.getenv("RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+# Seconds between rules file change checks, 0 disables the watcher
+RULES_RELOAD_INTERVAL = float(os.getenv("RULES_RELOAD_INTERVAL", "5"))
+
+# Telegram webhook: expected X-Telegram-Bot-Api-Secret-Token, unchecked when unset
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+
+# Deferred enrichment: ingest returns right away, summary and suggested reply
+# are filled in by background workers (see enrichment.py)
+DEFERRED_ENRICHMENT = os.getenv("DEFERRED_ENRICHMENT", "false").lower() in ("1", "true", "yes")
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+# Tickets waiting or in progress; when full, ingest enriches inline again
+ENRICHMENT_QUEUE_SIZE = int(os.getenv("ENRICHMENT_QUEUE_SIZE", "1000"))
+# Seconds after which a not enriched ticket claimed by another process is
+# taken over, e.g. because that process died
+ENRICHMENT_LEASE = float(os.getenv("ENRICHMENT_LEASE", "600"))
+
+# Durable ingest queue: /api/ingest appends to the ingest_queue table and
+# consumer workers process it in batches (see ingest_queue.py)
+INGEST_QUEUE_ENABLED = os.getenv("INGEST_QUEUE", "false").lower() in ("1", "true", "yes")
+INGEST_QUEUE_WORKERS = int(os.getenv("INGEST_QUEUE_WORKERS", "2"))
+INGEST_QUEUE_BATCH = int(os.getenv("INGEST_QUEUE_BATCH", "100"))
+# Seconds /api/ingest waits for its item before answering 202 with the queue id
+INGEST_QUEUE_WAIT = float(os.getenv("INGEST_QUEUE_WAIT", "5"))
+# Seconds after which an item claimed by a dead consumer is claimed again
+INGEST_QUEUE_LEASE = float(os.getenv("INGEST_QUEUE_LEASE", "60"))
+INGEST_QUEUE_MAX_ATTEMPTS = 3
+# Seconds processed items are kept for GET /api/ingest/queue/{queue_id}
+INGEST_QUEUE_RETENTION = float(os.getenv("INGEST_QUEUE_RETENTION", str(24 * 3600)))
+
+# Seconds ticket change events are kept for clients resuming the live feed
+TICKET_EVENTS_RETENTION = float(os.getenv("TICKET_EVENTS_RETENTION", str(24 * 3600)))
+# Seconds a gap in the event ids is waited on before it is taken for a rolled
+# back transaction; covers a writer that waits for the SQLite lock
+TICKET_EVENTS_COMMIT_GRACE = float(os.getenv("TICKET_EVENTS_COMMIT_GRACE", str(SQLITE_BUSY_TIMEOUT / 1000 + 1)))
+
+# Maximum number of requests accepted by /api/ingest/batch
+MAX_INGEST_BATCH = 1000
 
 # Categories
 CATEGORIES = [
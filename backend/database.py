@@ -1,14 +1,102 @@
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from models import Base
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_SIZE, SQLITE_JOURNAL_MODE, SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS
+)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def sqlite_pragmas() -> dict:
+    """Pragmas of the SQLite profile, applied to every new connection"""
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+    }
+
+def configure_engine(engine: Engine, pragmas: Optional[dict] = None) -> Engine:
+    """Set the SQLite pragmas (default: sqlite_pragmas()) on each connection the engine opens"""
+    if engine.dialect.name != "sqlite":
+        return engine
+    if pragmas is None:
+        pragmas = sqlite_pragmas()
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    
+    return engine
+
+def pool_options() -> dict:
+    """Pool sizing shared by the sync and async engine"""
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+
+def engine_options(url: str) -> dict:
+    """
+    create_engine() arguments for the database behind url
+    
+    SQLite connections are shared between threads by the pool; server
+    connections (PostgreSQL) are checked before use and recycled, so
+    connections dropped by the server or a proxy are replaced.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return {**pool_options(), "pool_pre_ping": True, "pool_recycle": DB_POOL_RECYCLE}
+    options = {"connect_args": {"check_same_thread": False}}
+    if url.database not in (None, "", ":memory:"):
+        # In-memory databases use a single-connection pool without sizing
+        options.update(pool_options())
+    return options
+
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API handlers so DB I/O does not block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db():
     """Initialize database and create tables"""
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+
+def migrate_db():
+    """
+    Bring an existing database up to the current schema
+    
+    create_all() skips tables that already exist, together with their
+    columns and indexes, so columns and indexes added later are created here.
+    New columns need a server default or must be nullable.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if not isinstance(default, str):
+                        default = default.compile(dialect=engine.dialect)
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_db():
     """Dependency for getting database session"""
@@ -17,3 +105,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependency for getting async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,129 @@
+"""
+Background enrichment of tickets
+
+With DEFERRED_ENRICHMENT enabled, ingest saves a ticket with its
+classification and returns; the summary and suggested reply, which may
+need slow LLM calls, are generated afterwards by a pool of worker tasks
+and the ticket is marked enriched.
+
+The queue is bounded: when ENRICHMENT_QUEUE_SIZE tickets are waiting or
+in progress, ingest falls back to enriching inline, so a slow model slows
+callers down instead of letting the backlog grow without limit. Queued
+ticket ids live only in memory. Each queued ticket carries a claim token
+of the process that queued it, and the handler only saves the enrichment
+while the ticket still holds that token; on startup and then every half
+lease the workers claim and queue the not enriched tickets whose claim is
+older than ENRICHMENT_LEASE, so tickets of a process that died are picked
+up once, not by every worker and bot process that starts.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import ENRICHMENT_LEASE, ENRICHMENT_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+class EnrichmentQueue:
+    def __init__(self, maxsize: int = ENRICHMENT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._handler: Callable[[int, str], Awaitable[None]] = None
+        self._recovery: Optional[asyncio.Task] = None
+        # Waiting in the queue plus being processed
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.inline = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(
+        self,
+        handler: Callable[[int, str], Awaitable[None]],
+        workers: int,
+        recover: Optional[Callable[[int], Awaitable[List[Tuple[int, str]]]]] = None,
+        lease: float = ENRICHMENT_LEASE
+    ) -> None:
+        """
+        Start the workers, which call handler(ticket_id, claim); recover(limit)
+        claims up to limit abandoned tickets, returning (ticket_id, claim)
+        pairs, and is run now and every half lease
+        """
+        self._handler = handler
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+        if recover is not None:
+            self._recovery = asyncio.create_task(self._recover(recover, lease / 2))
+
+    async def stop(self) -> None:
+        tasks = self._workers + ([self._recovery] if self._recovery else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._recovery = None
+
+    async def _recover(self, recover: Callable[[int], Awaitable[List[Tuple[int, str]]]], interval: float) -> None:
+        while True:
+            try:
+                capacity = self.maxsize - self.pending
+                if capacity > 0:
+                    claimed = await recover(capacity)
+                    if claimed:
+                        logger.info("Queued %s tickets left not enriched", len(claimed))
+                    self.submit(claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Enrichment recovery failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """
+        True when count more tickets can be deferred
+
+        Checked before the tickets are saved, so concurrent requests may
+        overshoot the limit by the number of requests in flight.
+        """
+        return self.running and self.pending + count <= self.maxsize
+
+    def submit(self, claimed: Iterable[Tuple[int, str]]) -> None:
+        """Queue (ticket_id, claim) pairs"""
+        for item in claimed:
+            self.pending += 1
+            self._queue.put_nowait(item)
+
+    async def _work(self) -> None:
+        while True:
+            ticket_id, claim = await self._queue.get()
+            try:
+                await self._handler(ticket_id, claim)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The ticket stays not enriched and is taken again once its claim expires
+                self.failed += 1
+                logger.error("Enrichment of ticket %s failed: %s", ticket_id, e)
+            finally:
+                self.pending -= 1
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.running,
+            "pending": self.pending,
+            "maxsize": self.maxsize,
+            "completed": self.completed,
+            "failed": self.failed,
+            "inline": self.inline
+        }
+
+ENRICHMENT_QUEUE = EnrichmentQueue()
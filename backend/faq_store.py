@@ -1,7 +1,12 @@
 import re
-from typing import Dict, List
+from collections import Counter
+from typing import Dict, List, Set
 import math
 
+import numpy as np
+
+from config import FAQ_SCORER
+
 FAQ = [
     {
         "q": "Как подключиться к VPN?",
@@ -45,10 +50,12 @@ FAQ_KZ = [
     }
 ]
 
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
 def tokenize(text: str) -> List[str]:
     """Simple tokenization"""
     text = text.lower()
-    text = re.sub(r'[^\w\s]', ' ', text)
+    text = _NON_WORD_RE.sub(' ', text)
     return text.split()
 
 def cosine_similarity(text1: str, text2: str) -> float:
@@ -69,27 +76,260 @@ def cosine_similarity(text1: str, text2: str) -> float:
     
     return numerator / denominator if denominator > 0 else 0.0
 
-def semantic_search_faq(text: str, language: str = "ru") -> Dict:
-    """Search FAQ for best matching answer"""
-    faq_base = FAQ_KZ if language == "kz" else FAQ
+class FaqIndex:
+    """
+    Precomputed FAQ search index
     
-    best_match = None
-    best_score = 0.0
+    Questions and answers are tokenized once, each side gets a
+    token -> entry inverted index and precomputed norms, so a query only
+    scores the entries that share at least one token with it.
+    Scores are identical to cosine_similarity over the raw texts.
+    """
+
+    ANSWER_WEIGHT = 0.5
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = list(entries)
+        self.q_norms: List[float] = []
+        self.a_norms: List[float] = []
+        self.q_postings: Dict[str, List[int]] = {}
+        self.a_postings: Dict[str, List[int]] = {}
+
+        for idx, item in enumerate(self.entries):
+            q_tokens = set(tokenize(item["q"]))
+            a_tokens = set(tokenize(item["a"]))
+            self.q_norms.append(math.sqrt(len(q_tokens)))
+            self.a_norms.append(math.sqrt(len(a_tokens)))
+            for token in q_tokens:
+                self.q_postings.setdefault(token, []).append(idx)
+            for token in a_tokens:
+                self.a_postings.setdefault(token, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _overlap(tokens: Set[str], postings: Dict[str, List[int]]) -> Dict[int, int]:
+        """Count shared tokens per entry using the inverted index"""
+        counts: Dict[int, int] = {}
+        for token in tokens:
+            for idx in postings.get(token, ()):
+                counts[idx] = counts.get(idx, 0) + 1
+        return counts
+
+    def search(self, text: str) -> Dict:
+        """Return the best matching entry in semantic_search_faq format"""
+        tokens = set(tokenize(text))
+
+        best_idx = None
+        best_score = 0.0
+
+        if tokens:
+            query_norm = math.sqrt(len(tokens))
+            q_hits = self._overlap(tokens, self.q_postings)
+            a_hits = self._overlap(tokens, self.a_postings)
+
+            # Entries are visited in FAQ order so ties resolve like the linear scan
+            for idx in sorted(q_hits.keys() | a_hits.keys()):
+                score_q = q_hits.get(idx, 0) / (query_norm * self.q_norms[idx])
+                score_a = a_hits.get(idx, 0) / (query_norm * self.a_norms[idx]) * self.ANSWER_WEIGHT
+                score = max(score_q, score_a)
+
+                if score > best_score:
+                    best_score = score
+                    best_idx = idx
+
+        best_match = self.entries[best_idx] if best_idx is not None else None
+
+        return {
+            "best_answer": best_match["a"] if best_match else None,
+            "best_question": best_match["q"] if best_match else None,
+            "similarity": best_score
+        }
+
+    def search_batch(self, texts: List[str]) -> List[Dict]:
+        """Search FAQ for every text, results are in input order"""
+        return [self.search(text) for text in texts]
+
+class TfidfFaqIndex:
+    """
+    TF-IDF FAQ scorer backed by a CSR sparse matrix
     
-    for item in faq_base:
-        # Compare with question
-        score_q = cosine_similarity(text, item["q"])
-        # Also compare with answer for better matching
-        score_a = cosine_similarity(text, item["a"]) * 0.5
-        
-        score = max(score_q, score_a)
-        
-        if score > best_score:
-            best_score = score
-            best_match = item
+    Every FAQ entry contributes two L2-normalised documents (question and
+    answer) with sublinear tf and smoothed idf weights. The matrix is kept
+    term-major (CSR of the transposed doc-term matrix), so scoring a query
+    against all entries is one sparse product: only the posting lists of the
+    query terms are touched. Batches of queries are scored in one pass.
     
-    return {
-        "best_answer": best_match["a"] if best_match else None,
-        "best_question": best_match["q"] if best_match else None,
-        "similarity": best_score
-    }
+    Query terms missing from the vocabulary still count towards the query
+    norm (with the maximum idf), so unknown words lower the similarity
+    instead of being silently dropped.
+    """
+
+    ANSWER_WEIGHT = 0.5
+    # Upper bound on the (queries x documents) score block per pass, sized to stay in cache
+    MAX_BLOCK_CELLS = 65_536
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = list(entries)
+        self.vocab: Dict[str, int] = {}
+
+        docs: List[Counter] = []
+        for item in self.entries:
+            docs.append(Counter(tokenize(item["q"])))
+            docs.append(Counter(tokenize(item["a"])))
+        self.n_docs = len(docs)
+
+        df: Counter = Counter()
+        for doc in docs:
+            for token in doc:
+                if token not in self.vocab:
+                    self.vocab[token] = len(self.vocab)
+                df[self.vocab[token]] += 1
+
+        n_terms = len(self.vocab)
+        df_arr = np.zeros(n_terms, dtype=np.float64)
+        for term_id, count in df.items():
+            df_arr[term_id] = count
+        self.idf = np.log((1 + self.n_docs) / (1 + df_arr)) + 1.0
+        self.oov_idf = math.log(1 + self.n_docs) + 1.0
+
+        # Doc-term matrix in CSR form
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for doc in docs:
+            term_ids = [self.vocab[token] for token in doc]
+            weights = [(1.0 + math.log(count)) * self.idf[t] for t, count in zip(term_ids, doc.values())]
+            norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+            indices.extend(term_ids)
+            data.extend(w / norm for w in weights)
+            indptr.append(len(indices))
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+
+        # Term-major copy (CSR of the transpose) used for scoring
+        doc_ids = np.repeat(np.arange(self.n_docs, dtype=np.int64), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        self.t_indices = doc_ids[order]
+        self.t_data = self.data[order]
+        self.t_indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n_terms), out=self.t_indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _query_vectors(self, texts: List[str]):
+        """Build (row, term, weight) triples of the normalised query vectors"""
+        rows: List[int] = []
+        terms: List[int] = []
+        weights: List[float] = []
+
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            row_terms = []
+            row_weights = []
+            sq_norm = 0.0
+            for token, count in counts.items():
+                tf = 1.0 + math.log(count)
+                term_id = self.vocab.get(token)
+                if term_id is None:
+                    sq_norm += (tf * self.oov_idf) ** 2
+                    continue
+                w = tf * self.idf[term_id]
+                sq_norm += w * w
+                row_terms.append(term_id)
+                row_weights.append(w)
+            if not row_terms:
+                continue
+            norm = math.sqrt(sq_norm)
+            rows.extend([row] * len(row_terms))
+            terms.extend(row_terms)
+            weights.extend(w / norm for w in row_weights)
+
+        return (
+            np.asarray(rows, dtype=np.int64),
+            np.asarray(terms, dtype=np.int64),
+            np.asarray(weights, dtype=np.float64),
+        )
+
+    def score_batch(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), len(entries)) matrix of entry scores"""
+        n_queries = len(texts)
+        doc_scores = np.zeros((n_queries, self.n_docs), dtype=np.float64)
+
+        rows, terms, weights = self._query_vectors(texts)
+        if self.n_docs and len(rows):
+            starts = self.t_indptr[terms]
+            lens = self.t_indptr[terms + 1] - starts
+            total = int(lens.sum())
+            if total:
+                # Expand every query term into its posting list in one shot
+                offsets = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(total)
+                flat = np.repeat(rows, lens) * self.n_docs + self.t_indices[offsets]
+                values = self.t_data[offsets] * np.repeat(weights, lens)
+                doc_scores = np.bincount(
+                    flat, weights=values, minlength=n_queries * self.n_docs
+                ).reshape(n_queries, self.n_docs)
+
+        return np.maximum(doc_scores[:, 0::2], doc_scores[:, 1::2] * self.ANSWER_WEIGHT)
+
+    def _result(self, scores: np.ndarray) -> Dict:
+        best_idx = int(scores.argmax()) if len(scores) else 0
+        best_score = float(scores[best_idx]) if len(scores) else 0.0
+        best_match = self.entries[best_idx] if best_score > 0 else None
+
+        return {
+            "best_answer": best_match["a"] if best_match else None,
+            "best_question": best_match["q"] if best_match else None,
+            "similarity": best_score if best_match else 0.0
+        }
+
+    def search(self, text: str) -> Dict:
+        """Return the best matching entry in semantic_search_faq format"""
+        return self.search_batch([text])[0]
+
+    def search_batch(self, texts: List[str]) -> List[Dict]:
+        """Search FAQ for every text, results are in input order"""
+        results: List[Dict] = []
+        chunk = max(1, self.MAX_BLOCK_CELLS // max(1, self.n_docs))
+        for start in range(0, len(texts), chunk):
+            scores = self.score_batch(texts[start:start + chunk])
+            results.extend(self._result(row) for row in scores)
+        return results
+
+FAQ_SCORERS = {
+    "overlap": FaqIndex,
+    "tfidf": TfidfFaqIndex,
+}
+
+# Indexes are built once at import time and rebuilt by rebuild_faq_indexes()
+FAQ_INDEX = FAQ_SCORERS[FAQ_SCORER](FAQ)
+FAQ_INDEX_KZ = FAQ_SCORERS[FAQ_SCORER](FAQ_KZ)
+# Incremented on every rebuild, caches of search results compare against it
+_faq_generation = 0
+
+def rebuild_faq_indexes() -> int:
+    """Rebuild both indexes after FAQ or FAQ_KZ was changed, returns the new generation"""
+    global FAQ_INDEX, FAQ_INDEX_KZ, _faq_generation
+    FAQ_INDEX = FAQ_SCORERS[FAQ_SCORER](FAQ)
+    FAQ_INDEX_KZ = FAQ_SCORERS[FAQ_SCORER](FAQ_KZ)
+    _faq_generation += 1
+    return _faq_generation
+
+def get_faq_generation() -> int:
+    return _faq_generation
+
+def get_faq_index(language: str = "ru"):
+    """Return the FAQ index for the given language"""
+    return FAQ_INDEX_KZ if language == "kz" else FAQ_INDEX
+
+def semantic_search_faq(text: str, language: str = "ru") -> Dict:
+    """Search FAQ for best matching answer"""
+    return get_faq_index(language).search(text)
+
+def semantic_search_faq_batch(texts: List[str], language: str = "ru") -> List[Dict]:
+    """Search FAQ for a batch of texts in one pass"""
+    return get_faq_index(language).search_batch(texts)
@@ -0,0 +1,63 @@
+"""
+Conditional GET for the read endpoints
+
+The ticket_events head (ticket_events.settled_head) doubles as a version
+counter of the tickets table: every create, update and delete (and a bulk
+import) writes an event in the same transaction, so the head moves
+whenever any ticket changes, also when an event with a lower id commits
+late on PostgreSQL. Reading it walks the primary key over the last few
+seconds of events, so a poll with a matching If-None-Match gets 304 Not
+Modified before any ticket is loaded or serialised. Single tickets are
+validated by their own updated_at.
+
+Last-Modified is sent for information only. It has one second resolution
+while tickets change many times a second, so If-Modified-Since is ignored
+(RFC 9110 13.1.3 allows it) rather than answering 304 for a change made
+in the same second.
+
+Responses carry Cache-Control: no-cache, so browsers revalidate on every
+request instead of serving a heuristically fresh copy.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ticket_events import settled_head
+
+async def tickets_version(db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+    """Id and time of the newest settled ticket change, (0, None) before the first one"""
+    return await settled_head(db)
+
+def epoch_us(value: Optional[datetime]) -> int:
+    """Naive UTC datetime as microseconds since the epoch, 0 for None"""
+    if value is None:
+        return 0
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """Strong ETag from the given parts, weak when the body may differ for the same parts"""
+    tag = '"' + "-".join(str(part) for part in parts) + '"'
+    return "W/" + tag if weak else tag
+
+def validators(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """ETag, Last-Modified and Cache-Control response headers"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        # Stored datetimes are naive UTC
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's cached copy is current by If-None-Match (RFC 9110 13.1.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
@@ -0,0 +1,194 @@
+"""
+Bulk import of historical tickets
+
+Reads tickets from a CSV file (header row) or JSON Lines file, one ticket
+per row. Only "text" (or "body") is required; "subject", "status",
+"created_at", "updated_at", "summary" and "suggested_reply" are taken
+when present. Language, category, priority and department are set by the
+same classifiers as /api/ingest, the summary defaults to the first words
+of the text. No LLM calls are made and the tickets are saved enriched.
+
+Rows are streamed in batches, each written in one transaction together
+with its ticket_stats delta and a reset ticket event: COPY FROM STDIN on
+PostgreSQL (psycopg2 or psycopg 3), executemany on SQLite.
+
+Run from backend/:
+    python import_tickets.py history.csv
+    python import_tickets.py history.jsonl --batch-size 10000 --status closed
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy.engine import Connection
+
+import ai_core
+from database import SessionLocal, engine, init_db
+from ingest_service import analyze_text
+from models import IngestRequest, Ticket
+from stats import ensure_ticket_stats, stats_upsert, ticket_delta
+from ticket_events import reset_event_statement
+
+# Ticket columns written by the import, in COPY order
+COLUMNS = [
+    "subject", "body", "language", "category", "priority", "department", "status",
+    "summary", "suggested_reply", "enriched", "created_at", "updated_at",
+]
+# NULL marker of the CSV fed to COPY
+COPY_NULL = "\\N"
+
+def read_records(path: str, fmt: str) -> Iterator[Dict]:
+    """Rows of a CSV or JSON Lines file as dicts, read lazily"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def parse_datetime(value) -> Optional[datetime]:
+    """ISO 8601 timestamp as naive UTC, like the datetime.utcnow defaults of the model; ValueError if malformed"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def ticket_row(record: Dict, default_status: str, now: datetime) -> Optional[Dict]:
+    """Classified ticket row for a record, None when it has no text"""
+    text = (record.get("text") or record.get("body") or "").strip()
+    if not text:
+        return None
+
+    analysis = analyze_text(text)
+    created_at = parse_datetime(record.get("created_at")) or now
+    return {
+        "subject": record.get("subject") or IngestRequest.model_fields["subject"].default,
+        "body": text,
+        "language": analysis["language"],
+        "category": analysis["category"],
+        "priority": analysis["priority"],
+        "department": analysis["department"],
+        "status": record.get("status") or default_status,
+        "summary": record.get("summary") or ai_core.truncate_summary(analysis["text_ru"]),
+        "suggested_reply": record.get("suggested_reply") or None,
+        "enriched": True,
+        "created_at": created_at,
+        "updated_at": parse_datetime(record.get("updated_at")) or created_at,
+    }
+
+def copy_rows(conn: Connection, rows: List[Dict]) -> None:
+    """Send rows with COPY FROM STDIN over the connection's driver"""
+    cursor = conn.connection.dbapi_connection.cursor()
+    statement = f"COPY {Ticket.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    data = csv_lines(rows)
+    try:
+        if conn.dialect.driver == "psycopg":
+            with cursor.copy(statement) as copy:
+                copy.write(data)
+        else:
+            cursor.copy_expert(statement, io.StringIO(data))
+    finally:
+        cursor.close()
+
+def csv_lines(rows: Iterable[Dict]) -> str:
+    """Rows as COPY CSV in COLUMNS order"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([
+            COPY_NULL if row[column] is None
+            else row[column].isoformat() if isinstance(row[column], datetime)
+            else row[column]
+            for column in COLUMNS
+        ])
+    return buffer.getvalue()
+
+def write_batch(rows: List[Dict]) -> None:
+    """Insert one batch, its counter delta and a reset event in a single transaction"""
+    delta: Counter = Counter()
+    for row in rows:
+        delta.update(ticket_delta(row["category"], row["status"], row["priority"]))
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            copy_rows(conn, rows)
+        else:
+            conn.execute(Ticket.__table__.insert(), rows)
+        stmt = stats_upsert(conn.dialect.name, delta)
+        if stmt is not None:
+            conn.execute(stmt)
+        # Moves the tickets version with every committed batch, so cached lists,
+        # the live feed and /tickets/changes never miss a batch; open operator
+        # panels reload the list instead of receiving every ticket
+        conn.execute(reset_event_statement())
+
+def import_tickets(records: Iterable[Dict], batch_size: int, default_status: str) -> Dict[str, int]:
+    """
+    Classify and insert records batch by batch
+
+    Returns the imported count, the rows skipped for having no text and
+    those skipped for an unparsable created_at / updated_at.
+    """
+    counts = {"imported": 0, "skipped": 0, "invalid": 0}
+    now = datetime.utcnow()
+    records = iter(records)
+    number = 0
+    start = time.perf_counter()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return counts
+        rows = []
+        for record in batch:
+            number += 1
+            try:
+                row = ticket_row(record, default_status, now)
+            except ValueError as exc:
+                # Earlier batches are already committed, one bad row must not end the run
+                print(f"row {number}: {exc}, skipped", file=sys.stderr)
+                counts["invalid"] += 1
+                continue
+            if row:
+                rows.append(row)
+            else:
+                counts["skipped"] += 1
+        if rows:
+            write_batch(rows)
+            counts["imported"] += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{counts['imported']} tickets imported ({counts['imported'] / elapsed:.0f}/s)", file=sys.stderr)
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or JSON Lines file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--status", default="closed", help="status of rows without one")
+    args = parser.parse_args(argv[1:])
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    init_db()
+    with SessionLocal() as db:
+        # Counters are built from the existing tickets first, the import adds deltas
+        ensure_ticket_stats(db)
+
+    counts = import_tickets(read_records(args.path, fmt), args.batch_size, args.status)
+    print(
+        f"Imported {counts['imported']} tickets, skipped {counts['skipped']} rows without text"
+        f" and {counts['invalid']} with an invalid timestamp"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,320 @@
+"""
+Durable ingest queue
+
+With INGEST_QUEUE=true, /api/ingest only appends the request to the
+ingest_queue table (one INSERT and commit) and consumer workers drain the
+table in batches through the ingest pipeline. A burst is absorbed by the
+table instead of piling up in front of the pipeline until clients time
+out.
+
+The caller waits up to INGEST_QUEUE_WAIT seconds for its item; if it is
+not processed by then the response is 202 with the queue id, and the
+result can be fetched from GET /api/ingest/queue/{queue_id}.
+
+Crash safety: items are committed before they are acknowledged, and a
+batch is marked done in the same transaction that inserts its tickets.
+Items claimed by a consumer that died are claimed again once their lease
+(INGEST_QUEUE_LEASE seconds) has expired. A consumer whose batch outlived
+the lease checks, in the transaction that commits its tickets, that it
+still owns every item; if another consumer has taken them over, its
+tickets are rolled back, so a request never creates two tickets.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    INGEST_QUEUE_BATCH, INGEST_QUEUE_LEASE, INGEST_QUEUE_MAX_ATTEMPTS, INGEST_QUEUE_RETENTION
+)
+from database import AsyncSessionLocal
+from ingest_service import ingest_response, stage_tickets, submit_for_enrichment
+from models import IngestQueueItem, IngestRequest
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for items enqueued by other processes
+POLL_INTERVAL = 0.5
+# Seconds between checks of a waited-for item, it may be processed by another process
+WAIT_POLL_INTERVAL = 0.2
+# Window of the latency percentiles and the drain rate
+METRICS_WINDOW = 60.0
+# Seconds between purges of old processed items
+PURGE_INTERVAL = 3600.0
+
+class ClaimedItem(NamedTuple):
+    id: int
+    payload: str
+    enqueued_at: float
+    attempts: int
+    claim: str
+
+class ClaimLost(Exception):
+    """Another consumer took the items over after the lease expired"""
+
+class IngestQueue:
+    def __init__(self, batch_size: int = INGEST_QUEUE_BATCH, lease: float = INGEST_QUEUE_LEASE):
+        self.batch_size = batch_size
+        self.lease = lease
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        # Items enqueued by this process whose caller is waiting
+        self._waiters: Dict[int, asyncio.Future] = {}
+        # (processed_at, enqueue-to-processed latency) of recently processed items
+        self._recent: Deque[Tuple[float, float]] = deque()
+        self._last_purge = 0.0
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, workers: int) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, request: IngestRequest, db: AsyncSession) -> IngestQueueItem:
+        """Durably append a request"""
+        item = IngestQueueItem(payload=request.model_dump_json(), state="pending", enqueued_at=time.time())
+        db.add(item)
+        await db.commit()
+        self.enqueued += 1
+        self._wakeup.set()
+        return item
+
+    async def wait(self, queue_id: int, timeout: float) -> bool:
+        """
+        Wait until the item has been processed
+        
+        Consumers of this process wake the caller right away; the row state
+        is re-read every WAIT_POLL_INTERVAL for items finished by consumers
+        of other worker processes.
+        """
+        future = self._waiters.setdefault(queue_id, asyncio.get_running_loop().create_future())
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), min(remaining, WAIT_POLL_INTERVAL))
+                    return True
+                except asyncio.TimeoutError:
+                    pass
+                async with AsyncSessionLocal() as db:
+                    state = await db.scalar(select(IngestQueueItem.state).where(IngestQueueItem.id == queue_id))
+                if state in ("done", "failed"):
+                    return True
+        finally:
+            self._waiters.pop(queue_id, None)
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                processed = await self.drain_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ingest queue consumer error: %s", e)
+                processed = 0
+            if not processed:
+                if time.time() - self._last_purge > PURGE_INTERVAL:
+                    self._last_purge = time.time()
+                    async with AsyncSessionLocal() as db:
+                        await self.purge(db)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim(self, db: AsyncSession) -> List[ClaimedItem]:
+        """Atomically take up to batch_size pending (or abandoned) items"""
+        claim = uuid.uuid4().hex
+        now = time.time()
+        candidates = (
+            select(IngestQueueItem.id)
+            .where(or_(
+                IngestQueueItem.state == "pending",
+                (IngestQueueItem.state == "processing") & (IngestQueueItem.claimed_at < now - self.lease)
+            ))
+            .order_by(IngestQueueItem.id)
+            .limit(self.batch_size)
+            # PostgreSQL: concurrent consumers skip each other's rows (no-op on SQLite)
+            .with_for_update(skip_locked=True)
+        )
+        await db.execute(
+            update(IngestQueueItem)
+            .where(IngestQueueItem.id.in_(candidates.scalar_subquery()))
+            .values(state="processing", claim=claim, claimed_at=now, attempts=IngestQueueItem.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        result = await db.execute(
+            select(IngestQueueItem.id, IngestQueueItem.payload, IngestQueueItem.enqueued_at, IngestQueueItem.attempts)
+            .where(IngestQueueItem.claim == claim)
+            .order_by(IngestQueueItem.id)
+        )
+        return [ClaimedItem(*row, claim) for row in result.all()]
+
+    async def drain_batch(self) -> int:
+        """Claim and process one batch, returns the number of items taken"""
+        async with AsyncSessionLocal() as db:
+            items = await self._claim(db)
+            if not items:
+                return 0
+            try:
+                await self._process(db, items)
+            except Exception as e:
+                await db.rollback()
+                if len(items) == 1:
+                    if not isinstance(e, ClaimLost):
+                        await self._fail(db, items[0], e)
+                else:
+                    # Isolate the item that breaks the batch, or the ones still owned
+                    logger.warning("Ingest queue batch of %s failed (%s), retrying one by one", len(items), e)
+                    for item in items:
+                        try:
+                            await self._process(db, [item])
+                        except ClaimLost:
+                            await db.rollback()
+                        except Exception as item_error:
+                            await db.rollback()
+                            await self._fail(db, item, item_error)
+        self._prune_metrics()
+        return len(items)
+
+    async def _process(self, db: AsyncSession, items: List[ClaimedItem]) -> None:
+        requests = [IngestRequest.model_validate_json(item.payload) for item in items]
+        tickets = await stage_tickets(requests, db)
+        now = time.time()
+        # The tickets are flushed, so this transaction holds the write lock
+        # (SQLite) or these rows' locks (PostgreSQL) until the commit: once
+        # the items are confirmed as ours nobody can take them over
+        owned = await db.execute(
+            update(IngestQueueItem)
+            .where(
+                IngestQueueItem.id.in_([item.id for item in items]),
+                IngestQueueItem.claim == items[0].claim,
+                IngestQueueItem.state == "processing"
+            )
+            .values(claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if owned.rowcount != len(items):
+            logger.warning("Ingest queue lost the claim on %s of %s items, rolling back the batch",
+                           len(items) - owned.rowcount, len(items))
+            raise ClaimLost()
+        await db.execute(update(IngestQueueItem), [
+            {
+                "id": item.id,
+                "state": "done",
+                "claim": None,
+                "ticket_id": ticket.id,
+                "result": ingest_response(ticket).model_dump_json(),
+                "processed_at": now
+            }
+            for item, ticket in zip(items, tickets)
+        ])
+        await db.commit()
+
+        submit_for_enrichment(tickets)
+        for item in items:
+            self._done(item, now)
+            self.processed += 1
+
+    async def _fail(self, db: AsyncSession, item: ClaimedItem, error: Exception) -> None:
+        """Put the item back for another attempt, or give up after INGEST_QUEUE_MAX_ATTEMPTS"""
+        logger.error("Ingest queue item %s failed (attempt %s): %s", item.id, item.attempts, error)
+        give_up = item.attempts >= INGEST_QUEUE_MAX_ATTEMPTS
+        result = await db.execute(
+            update(IngestQueueItem)
+            # Left alone when another consumer has taken the item over
+            .where(IngestQueueItem.id == item.id, IngestQueueItem.claim == item.claim)
+            .values(
+                state="failed" if give_up else "pending",
+                claim=None,
+                result=str(error) if give_up else None,
+                processed_at=time.time() if give_up else None
+            )
+        )
+        await db.commit()
+        if give_up and result.rowcount:
+            self.failed += 1
+            self._done(item, time.time())
+
+    def _done(self, item: ClaimedItem, now: float) -> None:
+        self._recent.append((now, now - item.enqueued_at))
+        waiter = self._waiters.get(item.id)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _prune_metrics(self) -> None:
+        cutoff = time.time() - METRICS_WINDOW
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    async def purge(self, db: AsyncSession, retention: float = INGEST_QUEUE_RETENTION) -> int:
+        """Delete processed items older than retention seconds"""
+        result = await db.execute(
+            delete(IngestQueueItem).where(
+                IngestQueueItem.state.in_(("done", "failed")),
+                IngestQueueItem.processed_at < time.time() - retention
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def stats(self, db: AsyncSession) -> Dict:
+        """Depth, latency percentiles and drain rate of the last minute"""
+        result = await db.execute(
+            select(IngestQueueItem.state, func.count())
+            .where(IngestQueueItem.state.in_(("pending", "processing")))
+            .group_by(IngestQueueItem.state)
+        )
+        depth = dict(result.all())
+        self._prune_metrics()
+        latencies = sorted(latency for _, latency in self._recent)
+
+        def percentile(pct: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 1)
+
+        return {
+            "enabled": self.running,
+            "pending": depth.get("pending", 0),
+            "processing": depth.get("processing", 0),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "latency_ms_p50": percentile(50),
+            "latency_ms_p95": percentile(95),
+            "drain_rate_per_s": round(len(latencies) / METRICS_WINDOW, 2)
+        }
+
+def queue_item_response(item: IngestQueueItem) -> Dict:
+    """QueuedIngestResponse payload for a queue item"""
+    response = {"status": "queued" if item.state == "pending" else item.state, "queue_id": item.id}
+    if item.state == "done":
+        response["result"] = json.loads(item.result)
+    elif item.state == "failed":
+        response["error"] = item.result
+    return response
+
+INGEST_QUEUE = IngestQueue()
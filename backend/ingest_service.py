@@ -0,0 +1,355 @@
+"""
+Ingest pipeline shared by the HTTP endpoints and the Telegram webhook
+
+Language detection, classification, FAQ search, auto-resolve decision and
+ticket creation, independent of the transport the request arrived on.
+The analysis part is cached per text and the FAQ match per token
+sequence, see analysis_cache.py.
+With DEFERRED_ENRICHMENT the summary and suggested reply are generated
+after the response by the enrichment workers, see enrichment.py.
+LocalIngest exposes the same pipeline to synchronous callers in another
+process (the Telegram bot with INGEST_MODE=local), skipping the HTTP
+round trip to /api/ingest.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import ai_core
+from analysis_cache import ANALYSIS_CACHE, FAQ_CACHE, current_generation, faq_key
+from config import DEFERRED_ENRICHMENT, ENRICHMENT_LEASE, ENRICHMENT_WORKERS, RULES_RELOAD_INTERVAL
+from enrichment import ENRICHMENT_QUEUE
+from database import AsyncSessionLocal, SessionLocal, init_db
+from faq_store import semantic_search_faq_batch
+from models import IngestRequest, IngestResponse, Ticket
+from rules import watch_rules
+from stats import apply_stats_delta, ensure_ticket_stats, ticket_delta
+from ticket_events import TICKET_FEED, add_ticket_event
+
+logger = logging.getLogger(__name__)
+
+def analyze_text(text: str) -> Dict:
+    """Language detection and classification of a request text"""
+    # Step 1: Detect language
+    language = ai_core.detect_language(text)
+    
+    # Step 2: Translate to Russian if needed for processing
+    text_ru = text
+    if language == "kz":
+        text_ru = ai_core.translate_to_ru(text)
+    
+    # Step 3: Classify
+    category, priority = ai_core.classify(text_ru)
+    
+    return {
+        "language": language,
+        "text_ru": text_ru,
+        "category": category,
+        "priority": priority,
+        "department": ai_core.route_department(category)
+    }
+
+def search_faq_batch(analyses: List[Dict]) -> List[Dict]:
+    """Step 4 for a batch: one FAQ search pass per language, results in input order"""
+    results: List[Dict] = [{}] * len(analyses)
+    by_language: Dict[str, List[int]] = defaultdict(list)
+    for i, analysis in enumerate(analyses):
+        by_language[analysis["language"]].append(i)
+    
+    for language, positions in by_language.items():
+        texts = [analyses[i]["text_ru"] for i in positions]
+        for i, result in zip(positions, semantic_search_faq_batch(texts, language)):
+            results[i] = result
+    
+    return results
+
+async def analyze_request(text: str, summarize: bool = True) -> Dict:
+    """
+    Steps 1-5 (analysis, FAQ match and summary), served from the analysis cache when possible
+    
+    With summarize=False (deferred enrichment) the summary is skipped on a
+    cache miss; cached values may then lack the "summary" key.
+    """
+    return (await analyze_requests([text], summarize))[0]
+
+async def analyze_requests(texts: List[str], summarize: bool = True) -> List[Dict]:
+    """analyze_request for a batch, FAQ cache misses share one search pass per language"""
+    generation = current_generation()
+    analyses = [ANALYSIS_CACHE.get(text, generation) for text in texts]
+    
+    missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+    for i in missing:
+        analyses[i] = analyze_text(texts[i])
+    
+    faq_keys = {i: faq_key(analyses[i]["language"], analyses[i]["text_ru"]) for i in missing}
+    for i in missing:
+        analyses[i]["faq"] = FAQ_CACHE.get(faq_keys[i], generation)
+    unmatched = [i for i in missing if analyses[i]["faq"] is None]
+    for i, faq_result in zip(unmatched, search_faq_batch([analyses[i] for i in unmatched])):
+        analyses[i]["faq"] = faq_result
+        FAQ_CACHE.put(faq_keys[i], faq_result, generation)
+    
+    changed = set(missing)
+    if summarize:
+        unsummarized = [i for i, analysis in enumerate(analyses) if "summary" not in analysis]
+        # Generated concurrently, the LLM client bounds the calls in flight
+        summaries = await asyncio.gather(
+            *[ai_core.generate_summary(analyses[i]["text_ru"]) for i in unsummarized]
+        )
+        for i, summary in zip(unsummarized, summaries):
+            # Cached values are shared, extend a copy
+            analyses[i] = {**analyses[i], "summary": summary}
+            changed.add(i)
+    
+    for i in changed:
+        ANALYSIS_CACHE.put(texts[i], analyses[i], generation)
+    
+    return analyses
+
+async def build_ticket(request: IngestRequest, analysis: Dict, deferred: bool = False) -> Ticket:
+    """
+    Step 6: auto-resolve decision and reply; the ticket is not saved
+    
+    A deferred ticket gets no summary or generated reply yet and is left
+    not enriched, claimed for the enrichment workers of this process.
+    """
+    language = analysis["language"]
+    text_ru = analysis["text_ru"]
+    category = analysis["category"]
+    faq_result = analysis["faq"]
+    best_answer = faq_result["best_answer"]
+    
+    # Step 6: Decide auto-resolve or create ticket
+    can_auto = ai_core.can_auto_resolve(faq_result["similarity"])
+    
+    if can_auto and best_answer:
+        # Auto-resolve, the FAQ answer is sent to the user
+        status = "closed_auto"
+        reply = best_answer
+    else:
+        # Create ticket for manual processing
+        status = "new"
+        reply = None if deferred else await ai_core.generate_suggested_reply(text_ru, category, best_answer)
+    
+    # Translate answer back to user's language
+    if language == "kz" and reply is not None:
+        reply = await ai_core.translate_answer(reply, "kz")
+    
+    return Ticket(
+        subject=request.subject,
+        body=request.text,
+        language=language,
+        category=category,
+        priority=analysis["priority"],
+        department=analysis["department"],
+        status=status,
+        summary=None if deferred else analysis["summary"],
+        suggested_reply=reply,
+        enriched=not deferred,
+        enrichment_claim=uuid.uuid4().hex if deferred else None,
+        enrichment_claimed_at=time.time() if deferred else None
+    )
+
+def ingest_response(ticket: Ticket) -> IngestResponse:
+    """Build the API response for a saved ticket"""
+    auto = ticket.status == "closed_auto"
+    return IngestResponse(
+        status=ticket.status,  # type: ignore
+        ticket_id=ticket.id,  # type: ignore
+        answer=ticket.suggested_reply if auto else None,  # type: ignore
+        category=ticket.category,  # type: ignore
+        priority=ticket.priority,  # type: ignore
+        department=ticket.department,  # type: ignore
+        summary=ticket.summary,  # type: ignore
+        suggested_reply=None if auto else ticket.suggested_reply,  # type: ignore
+        language=ticket.language,  # type: ignore
+        enriched=ticket.enriched  # type: ignore
+    )
+
+def defer_enrichment(count: int = 1) -> bool:
+    """Whether count new tickets go to the enrichment workers instead of being enriched inline"""
+    if not DEFERRED_ENRICHMENT:
+        return False
+    if ENRICHMENT_QUEUE.has_capacity(count):
+        return True
+    ENRICHMENT_QUEUE.inline += count
+    return False
+
+async def ingest_one(request: IngestRequest, db: AsyncSession) -> IngestResponse:
+    """Run the pipeline for one request and save the ticket"""
+    deferred = defer_enrichment()
+    analysis = await analyze_request(request.text, summarize=not deferred)
+    ticket = await build_ticket(request, analysis, deferred)
+    
+    db.add(ticket)
+    await apply_stats_delta(db, ticket_delta(ticket.category, ticket.status, ticket.priority))
+    await db.flush()
+    add_ticket_event(db, "created", ticket.id)
+    await db.commit()
+    
+    TICKET_FEED.notify()
+    if deferred:
+        ENRICHMENT_QUEUE.submit([(ticket.id, ticket.enrichment_claim)])
+    return ingest_response(ticket)
+
+async def stage_tickets(requests: List[IngestRequest], db: AsyncSession) -> List[Ticket]:
+    """
+    Run the pipeline for a batch and add the tickets and counters to the session
+    
+    One FAQ pass per language; the tickets are flushed, so they have ids,
+    and their feed events added, but the caller commits and then calls
+    submit_for_enrichment().
+    """
+    deferred = defer_enrichment(len(requests))
+    analyses = await analyze_requests([request.text for request in requests], summarize=not deferred)
+    # Replies of a whole queue batch must fit in its claim lease, generate them concurrently
+    tickets = await asyncio.gather(*[
+        build_ticket(request, analysis, deferred)
+        for request, analysis in zip(requests, analyses)
+    ])
+    
+    delta: Counter = Counter()
+    for ticket in tickets:
+        delta.update(ticket_delta(ticket.category, ticket.status, ticket.priority))
+    
+    db.add_all(tickets)
+    await apply_stats_delta(db, delta)
+    await db.flush()
+    for ticket in tickets:
+        add_ticket_event(db, "created", ticket.id)
+    return tickets
+
+def submit_for_enrichment(tickets: List[Ticket]) -> None:
+    """Queue committed tickets that were saved not enriched and wake the live feed"""
+    TICKET_FEED.notify()
+    ENRICHMENT_QUEUE.submit((ticket.id, ticket.enrichment_claim) for ticket in tickets if not ticket.enriched)
+
+async def ingest_many(requests: List[IngestRequest], db: AsyncSession) -> List[IngestResponse]:
+    """Run the pipeline for a batch: one FAQ pass per language and a single commit"""
+    tickets = await stage_tickets(requests, db)
+    await db.commit()
+    
+    submit_for_enrichment(tickets)
+    return [ingest_response(ticket) for ticket in tickets]
+
+async def enrich_ticket(ticket_id: int, claim: str) -> None:
+    """
+    Fill in summary and suggested reply of a deferred ticket and mark it enriched
+    
+    Saved only while the ticket still holds claim: once the lease expired
+    and another process took the ticket over, that process enriches it.
+    """
+    async with AsyncSessionLocal() as db:
+        ticket = await db.get(Ticket, ticket_id)
+        if ticket is None or ticket.enriched or ticket.enrichment_claim != claim:
+            return
+        
+        analysis = await analyze_request(ticket.body)
+        summary = ticket.summary
+        if summary is None:
+            summary = analysis["summary"]
+        reply = ticket.suggested_reply
+        if reply is None:
+            reply = await ai_core.generate_suggested_reply(
+                analysis["text_ru"], ticket.category, analysis["faq"]["best_answer"]
+            )
+            if ticket.language == "kz":
+                reply = await ai_core.translate_answer(reply, "kz")
+        
+        result = await db.execute(
+            update(Ticket)
+            .where(Ticket.id == ticket_id, Ticket.enriched.is_(False), Ticket.enrichment_claim == claim)
+            .values(summary=summary, suggested_reply=reply, enriched=True)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            logger.warning("Enrichment of ticket %s dropped, its claim was taken over", ticket_id)
+            return
+        add_ticket_event(db, "updated", ticket_id)
+        await db.commit()
+    TICKET_FEED.notify()
+
+async def claim_enrichment(limit: int, lease: float = ENRICHMENT_LEASE) -> List[Tuple[int, str]]:
+    """
+    Atomically take up to limit not enriched tickets that no live process owns
+    
+    A ticket is free when it was never claimed or its claim is older than
+    the lease, so tickets queued by another running worker are left alone.
+    """
+    claim = uuid.uuid4().hex
+    now = time.time()
+    async with AsyncSessionLocal() as db:
+        candidates = (
+            select(Ticket.id)
+            .where(
+                Ticket.enriched.is_(False),
+                or_(Ticket.enrichment_claimed_at.is_(None), Ticket.enrichment_claimed_at < now - lease)
+            )
+            .order_by(Ticket.id)
+            .limit(limit)
+            # PostgreSQL: concurrent claimers skip each other's rows (no-op on SQLite)
+            .with_for_update(skip_locked=True)
+        )
+        await db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(candidates.scalar_subquery()))
+            # updated_at is kept: taking a ticket over is not a change of the ticket
+            .values(enrichment_claim=claim, enrichment_claimed_at=now, updated_at=Ticket.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        result = await db.execute(select(Ticket.id).where(Ticket.enriched.is_(False), Ticket.enrichment_claim == claim).order_by(Ticket.id))
+        return [(ticket_id, claim) for ticket_id in result.scalars()]
+
+async def start_enrichment(workers: int = ENRICHMENT_WORKERS) -> None:
+    """Start the enrichment workers, which also take over tickets abandoned by other processes"""
+    ENRICHMENT_QUEUE.start(enrich_ticket, workers, recover=claim_enrichment)
+
+class LocalIngest:
+    """
+    Blocking entry point to ingest_one for threads outside an event loop
+    
+    Prepares the database like the backend startup does and runs its own
+    event loop in a daemon thread; ingest() can be called from many threads
+    at once. The rules file watcher and, with DEFERRED_ENRICHMENT, the
+    enrichment workers run on that loop as well.
+    """
+    
+    def __init__(self, rules_reload_interval: float = RULES_RELOAD_INTERVAL):
+        init_db()
+        with SessionLocal() as db:
+            ensure_ticket_stats(db)
+        
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ingest-loop", daemon=True)
+        self._thread.start()
+        self._rules_watcher = None
+        if rules_reload_interval > 0:
+            self._rules_watcher = asyncio.run_coroutine_threadsafe(
+                watch_rules(rules_reload_interval), self._loop
+            )
+        if DEFERRED_ENRICHMENT:
+            asyncio.run_coroutine_threadsafe(start_enrichment(), self._loop).result()
+    
+    async def _ingest(self, request: IngestRequest) -> IngestResponse:
+        async with AsyncSessionLocal() as db:
+            return await ingest_one(request, db)
+    
+    def ingest(self, request: IngestRequest, timeout: Optional[float] = None) -> IngestResponse:
+        """Run the pipeline for one request and wait for the result"""
+        future = asyncio.run_coroutine_threadsafe(self._ingest(request), self._loop)
+        return future.result(timeout)
+    
+    def close(self) -> None:
+        if self._rules_watcher:
+            self._rules_watcher.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,97 @@
+"""
+Multi-pattern keyword matching (Aho-Corasick)
+
+The automaton is compiled once from labelled keyword lists and finds every
+keyword occurring in a text in a single pass, so the cost of a lookup
+depends on the text length, not on the number of keywords.
+"""
+
+from collections import Counter, deque
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over labelled keyword lists
+
+    Keywords are matched as lowercase substrings, like `word in text.lower()`.
+    count() returns, per label, how many entries of that label's list occur in
+    the text (a keyword listed twice counts twice, as with sum(...) over the
+    list).
+    """
+
+    def __init__(self, groups: Dict[Hashable, Iterable[str]]):
+        # Trie: per state a char -> state map, plus the fail link
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Keyword ids ending in each state, including those reached via fail links
+        self._out: List[Tuple[int, ...]] = [()]
+        self._keywords: List[str] = []
+        # Keyword id -> (label, multiplicity)
+        self._labels: List[List[Tuple[Hashable, int]]] = []
+
+        ids: Dict[str, int] = {}
+        for label, words in groups.items():
+            for word, multiplicity in Counter(w.lower() for w in words if w).items():
+                if word not in ids:
+                    ids[word] = self._add(word)
+                self._labels[ids[word]].append((label, multiplicity))
+
+        self._build_fail_links()
+
+    def _add(self, word: str) -> int:
+        state = 0
+        for char in word:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        keyword_id = len(self._keywords)
+        self._keywords.append(word)
+        self._labels.append([])
+        self._out[state] = self._out[state] + (keyword_id,)
+        return keyword_id
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def find(self, text: str) -> Set[str]:
+        """Distinct keywords occurring in text"""
+        return {self._keywords[i] for i in self._find_ids(text.lower())}
+
+    def _find_ids(self, text: str) -> Set[int]:
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def count(self, text: str) -> Counter:
+        """Number of matched list entries per label"""
+        counts: Counter = Counter()
+        for keyword_id in self._find_ids(text.lower()):
+            for label, multiplicity in self._labels[keyword_id]:
+                counts[label] += multiplicity
+        return counts
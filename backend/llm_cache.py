@@ -0,0 +1,173 @@
+"""
+Persistent cache of LLM completions
+
+Completions are stored in a small SQLite file next to helpdesk.db, keyed
+on sha256(model, prompt), so repeated tickets and regenerated replies are
+served without a model call, also after a restart. Entries expire after
+LLM_CACHE_TTL seconds; when the stored responses exceed LLM_CACHE_MAX_BYTES
+the least recently used entries are evicted.
+
+Inspect or clear the cache (run from backend/):
+    python llm_cache.py stats
+    python llm_cache.py clear
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from config import LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH, LLM_CACHE_TTL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at);
+"""
+
+def cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """SQLite-backed completion cache with TTL, LRU size eviction and per-function hit counters"""
+
+    # Evict down to this share of the size limit, so eviction does not run on every put
+    EVICT_TO = 0.9
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        return self._conn
+
+    def get(self, function: str, model: str, prompt: str) -> Optional[str]:
+        """Cached completion or None; counted as a hit or miss of function"""
+        key = cache_key(model, prompt)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl > 0 and row[1] + self.ttl < now):
+                if row is not None:
+                    self._delete(conn, key)
+                self.misses[function] += 1
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits[function] += 1
+            return row[0]
+
+    def put(self, model: str, prompt: str, response: str) -> None:
+        key = cache_key(model, prompt)
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            self._delete(conn, key)
+            conn.execute(
+                "INSERT INTO llm_cache (key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        row = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._bytes -= row[0]
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Expired entries first, then least recently used
+        if self.ttl > 0:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        target = self.max_bytes * self.EVICT_TO
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > target:
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall()
+            victims = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            self.evictions += len(victims)
+        self._bytes = total
+
+    async def aget(self, function: str, model: str, prompt: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, function, model, prompt)
+
+    async def aput(self, model: str, prompt: str, response: str) -> None:
+        await asyncio.to_thread(self.put, model, prompt, response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM llm_cache")
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Entries, stored bytes and per-function hit rates of this worker"""
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            functions = {}
+            for function in sorted(self.hits.keys() | self.misses.keys()):
+                hits, misses = self.hits[function], self.misses[function]
+                functions[function] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+                }
+            return {
+                "entries": entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "evictions": self.evictions,
+                "functions": functions
+            }
+
+LLM_CACHE = LLMCache()
+
+def main(argv) -> int:
+    command = argv[1] if len(argv) > 1 else ""
+    if command == "stats":
+        stats = LLM_CACHE.stats()
+        print(f"{stats['entries']} entries, {stats['bytes']} of {stats['max_bytes']} bytes in {LLM_CACHE.path}")
+        return 0
+    if command == "clear":
+        LLM_CACHE.clear()
+        print(f"Cleared {LLM_CACHE.path}")
+        return 0
+    print(__doc__)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
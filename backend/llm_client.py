@@ -0,0 +1,160 @@
+"""
+Async client for an OpenAI-compatible chat completions API
+
+One pooled httpx.AsyncClient is shared by all requests of a worker. A
+semaphore caps the number of calls in flight, identical prompts that are
+already in flight share one upstream call, and the configured API keys
+are used round-robin with failover to the next key on rate limits,
+server errors, auth errors and timeouts.
+
+For offline runs point LLM_BASE_URL at the stub in benchmarks/llm_stub.py.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from config import (
+    API_MODEL, LLM_BASE_URL, LLM_MAX_CONCURRENCY, LLM_TIMEOUT, OPENAI_API_KEY, OPENAI_API_KEY2
+)
+
+logger = logging.getLogger(__name__)
+
+# Status codes after which the next key is tried
+FAILOVER_STATUSES = {401, 403, 408, 409, 429, 500, 502, 503, 504}
+
+class LLMError(RuntimeError):
+    """No key produced a completion"""
+
+class LLMClient:
+    def __init__(
+        self,
+        api_keys: List[str],
+        model: str = API_MODEL,
+        base_url: str = LLM_BASE_URL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT
+    ):
+        if not api_keys:
+            raise ValueError("at least one API key is required")
+        self.api_keys = api_keys
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._next_key = 0
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.failovers = 0
+        self.errors = 0
+
+    async def complete(self, prompt: str) -> str:
+        """Completion text for a single user prompt"""
+        self.requests += 1
+        key = (self.model, prompt)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(prompt)
+        except asyncio.CancelledError:
+            # Only the leader was cancelled, the followers get an ordinary failure
+            future.set_exception(LLMError("coalesced call cancelled"))
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else waits for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _call(self, prompt: str) -> str:
+        async with self._semaphore:
+            start = self._next_key
+            self._next_key = (self._next_key + 1) % len(self.api_keys)
+            last_error: Optional[str] = None
+
+            for attempt in range(len(self.api_keys)):
+                index = (start + attempt) % len(self.api_keys)
+                if attempt:
+                    self.failovers += 1
+                self.upstream_calls += 1
+                try:
+                    response = await asyncio.wait_for(
+                        self._post(self.api_keys[index], prompt), self.timeout
+                    )
+                except (asyncio.TimeoutError, httpx.TransportError) as e:
+                    last_error = f"key #{index + 1}: {type(e).__name__}"
+                    continue
+
+                if response.status_code in FAILOVER_STATUSES:
+                    last_error = f"key #{index + 1}: HTTP {response.status_code}"
+                    continue
+                if response.status_code != 200:
+                    self.errors += 1
+                    raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                try:
+                    return response.json()["choices"][0]["message"]["content"]
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    self.errors += 1
+                    raise LLMError(f"malformed response: {type(e).__name__}: {response.text[:200]}")
+
+            self.errors += 1
+            logger.warning("LLM call failed on all keys, last error %s", last_error)
+            raise LLMError(f"all API keys failed, last error {last_error}")
+
+    async def _post(self, api_key: str, prompt: str) -> httpx.Response:
+        return await self._http.post(
+            "/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "failovers": self.failovers,
+            "errors": self.errors,
+            "in_flight": len(self._inflight)
+        }
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+_client: Optional[LLMClient] = None
+
+def configured_api_keys() -> List[str]:
+    return [key for key in (OPENAI_API_KEY, OPENAI_API_KEY2) if key]
+
+def get_llm_client() -> Optional[LLMClient]:
+    """Shared client of this worker, None when no API key is configured"""
+    global _client
+    if _client is None and configured_api_keys():
+        _client = LLMClient(configured_api_keys())
+    return _client
+
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,14 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Dict
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
 
-from database import init_db, get_db
-from models import IngestRequest, IngestResponse, Ticket
-from router_tickets import router as tickets_router
-import ai_core
-from faq_store import semantic_search_faq
+from database import init_db, get_async_db, SessionLocal
+from http_cache import epoch_us, make_etag, not_modified, tickets_version, validators
+from models import IngestQueueItem, IngestRequest, IngestResponse, QueuedIngestResponse
+from router_tickets import router as tickets_router, NEXT_CURSOR_HEADER
+from router_admin import router as admin_router
+from router_telegram import router as telegram_router
+from config import (
+    DEFERRED_ENRICHMENT, INGEST_QUEUE_ENABLED, INGEST_QUEUE_WAIT, INGEST_QUEUE_WORKERS,
+    MAX_INGEST_BATCH, RULES_RELOAD_INTERVAL
+)
+from ingest_service import ingest_many, ingest_one, start_enrichment
+from enrichment import ENRICHMENT_QUEUE
+from ingest_queue import INGEST_QUEUE, queue_item_response
+from analysis_cache import ANALYSIS_CACHE, FAQ_CACHE
+from llm_client import close_llm_client
+from llm_cache import LLM_CACHE
+from ai_core import llm_generation_enabled
+from stats import ensure_ticket_stats, read_ticket_metrics
+from ticket_events import TICKET_FEED
+from rules import watch_rules
 
 app = FastAPI(title="AI HelpDesk OneWindow", version="1.0.0")
 
@@ -19,22 +36,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    with SessionLocal() as db:
+        ensure_ticket_stats(db)
+    if RULES_RELOAD_INTERVAL > 0:
+        app.state.rules_watcher = asyncio.create_task(watch_rules(RULES_RELOAD_INTERVAL))
+    if DEFERRED_ENRICHMENT:
+        await start_enrichment()
+    if INGEST_QUEUE_ENABLED:
+        INGEST_QUEUE.start(INGEST_QUEUE_WORKERS)
+    await TICKET_FEED.start()
+    TICKET_FEED.close_on_signals()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    watcher = getattr(app.state, "rules_watcher", None)
+    if watcher:
+        watcher.cancel()
+    await TICKET_FEED.stop()
+    await INGEST_QUEUE.stop()
+    await ENRICHMENT_QUEUE.stop()
+    await close_llm_client()
 
 # Include tickets router
 app.include_router(tickets_router, prefix="/api", tags=["tickets"])
+app.include_router(admin_router, prefix="/api", tags=["admin"])
+app.include_router(telegram_router, prefix="/api", tags=["telegram"])
 
 @app.get("/")
 async def root():
     return {"message": "AI HelpDesk OneWindow API", "version": "1.0.0"}
 
 @app.post("/api/ingest", response_model=IngestResponse)
-async def ingest_request(request: IngestRequest, db: Session = Depends(get_db)):
+async def ingest_request(request: IngestRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Main endpoint for processing user requests
     
@@ -43,106 +83,49 @@ async def ingest_request(request: IngestRequest, db: Session = Depends(get_db)):
     2. Classify category and priority
     3. Search FAQ
     4. Auto-resolve or create ticket
-    """
-    text = request.text
-    subject = request.subject
-    
-    # Step 1: Detect language
-    language = ai_core.detect_language(text)
-    
-    # Step 2: Translate to Russian if needed for processing
-    text_ru = text
-    if language == "kz":
-        text_ru = ai_core.translate_to_ru(text)
-    
-    # Step 3: Classify
-    category = ai_core.classify_category(text_ru)
-    priority = ai_core.classify_priority(text_ru)
-    department = ai_core.route_department(category)
     
-    # Step 4: Search FAQ
-    faq_result = semantic_search_faq(text_ru, language)
-    similarity = faq_result["similarity"]
-    best_answer = faq_result["best_answer"]
-    
-    # Step 5: Generate summary and suggested reply
-    summary = await ai_core.generate_summary(text_ru)
-    
-    # Step 6: Decide auto-resolve or create ticket
-    can_auto = ai_core.can_auto_resolve(similarity)
+    With INGEST_QUEUE enabled the request is appended to the durable queue
+    first; if the consumers do not process it within INGEST_QUEUE_WAIT
+    seconds the response is 202 with the queue id (see ingest_queue.py).
+    """
+    if not INGEST_QUEUE_ENABLED:
+        return await ingest_one(request, db)
+    
+    item = await INGEST_QUEUE.enqueue(request, db)
+    await INGEST_QUEUE.wait(item.id, INGEST_QUEUE_WAIT)
+    await db.refresh(item)
+    
+    if item.state == "done":
+        return IngestResponse.model_validate_json(item.result)
+    if item.state == "failed":
+        raise HTTPException(status_code=500, detail=f"Processing failed: {item.result}")
+    return JSONResponse(status_code=202, content=queue_item_response(item))
+
+@app.get("/api/ingest/queue/{queue_id}", response_model=QueuedIngestResponse)
+async def get_queued_ingest(queue_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get state and result of a request accepted by the ingest queue"""
+    item = await db.get(IngestQueueItem, queue_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Queue item not found")
+    
+    return queue_item_response(item)
+
+@app.post("/api/ingest/batch", response_model=List[IngestResponse])
+async def ingest_batch(requests: List[IngestRequest], db: AsyncSession = Depends(get_async_db)):
+    """
+    Process a burst of requests in one call
     
-    if can_auto and best_answer:
-        # Auto-resolve
-        answer = best_answer
-        
-        # Translate answer back to user's language
-        if language == "kz":
-            answer = await ai_core.translate_answer(answer, "kz")
-        
-        # Create ticket with closed_auto status
-        ticket = Ticket(
-            subject=subject,
-            body=text,
-            language=language,
-            category=category,
-            priority=priority,
-            department=department,
-            status="closed_auto",
-            summary=summary,
-            suggested_reply=answer
-        )
-        db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
-        
-        return IngestResponse(
-            status="closed_auto",
-            ticket_id=ticket.id,  # type: ignore
-            answer=answer,
-            category=category,
-            priority=priority,
-            department=department,
-            summary=summary,
-            language=language
-        )
+    Same flow as /api/ingest, but the FAQ search runs once per language for
+    the whole batch and all tickets are inserted with a single commit.
+    Responses are returned in input order.
+    """
+    if len(requests) > MAX_INGEST_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {MAX_INGEST_BATCH} requests")
     
-    else:
-        # Create ticket for manual processing
-        suggested_reply = await ai_core.generate_suggested_reply(text_ru, category, best_answer)
-        
-        # Translate suggested reply to user's language
-        if language == "kz":
-            suggested_reply = await ai_core.translate_answer(suggested_reply, "kz")
-        
-        ticket = Ticket(
-            subject=subject,
-            body=text,
-            language=language,
-            category=category,
-            priority=priority,
-            department=department,
-            status="new",
-            summary=summary,
-            suggested_reply=suggested_reply
-        )
-        db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
-        
-        return IngestResponse(
-            status="new",
-            ticket_id=ticket.id,  # type: ignore
-            answer=None,
-            category=category,
-            priority=priority,
-            department=department,
-            summary=summary,
-            suggested_reply=suggested_reply,
-            language=language
-        )
+    return await ingest_many(requests, db)
 
 @app.get("/api/metrics")
-async def get_metrics(db: Session = Depends(get_db)) -> Dict:
+async def get_metrics(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get helpdesk metrics
     
@@ -151,42 +134,42 @@ async def get_metrics(db: Session = Depends(get_db)) -> Dict:
     - Auto-resolved tickets
     - Manual tickets
     - Breakdown by category
-    """
-    total = db.query(func.count(Ticket.id)).scalar()
-    auto_resolved = db.query(func.count(Ticket.id)).filter(Ticket.status == "closed_auto").scalar()
-    manual = total - auto_resolved
-    
-    # Count by category
-    categories = db.query(
-        Ticket.category,
-        func.count(Ticket.id)
-    ).group_by(Ticket.category).all()
-    
-    by_category = {cat: count for cat, count in categories}
-    
-    # Count by status
-    statuses = db.query(
-        Ticket.status,
-        func.count(Ticket.id)
-    ).group_by(Ticket.status).all()
-    
-    by_status = {status: count for status, count in statuses}
+    - Analysis, FAQ and LLM cache statistics of this worker
     
-    # Count by priority
-    priorities = db.query(
-        Ticket.priority,
-        func.count(Ticket.id)
-    ).group_by(Ticket.priority).all()
-    
-    by_priority = {priority: count for priority, count in priorities}
+    Served from the ticket_stats counters, see stats.py. The counters only
+    change with the tickets, so the ETag is the tickets version and a match
+    answers 304 before anything else is read. The ETag is weak: the cache
+    statistics are read fresh for every full response but are not
+    validated, they differ between workers.
+    """
+    version, changed_at = await tickets_version(db)
+    etag = make_etag("metrics", version, epoch_us(changed_at), weak=True)
+    headers = validators(etag, changed_at)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    metrics = await read_ticket_metrics(db)
+    metrics.update({
+        "analysis_cache": ANALYSIS_CACHE.stats(),
+        "faq_cache": FAQ_CACHE.stats(),
+        # The cache file is only opened when generation is on
+        "llm_cache": await asyncio.to_thread(LLM_CACHE.stats) if llm_generation_enabled() else {"enabled": False},
+    })
+    return JSONResponse(content=jsonable_encoder(metrics), headers=headers)
+
+@app.get("/api/metrics/runtime")
+async def get_runtime_metrics(db: AsyncSession = Depends(get_async_db)) -> Dict:
+    """
+    Queue and feed statistics, not cached: most of them belong to the worker that answers
     
+    - Enrichment queue statistics of this worker
+    - Ingest queue depth, enqueue-to-processed latency and drain rate
+    - Live feed streams open on this worker
+    """
     return {
-        "total": total,
-        "auto_resolved": auto_resolved,
-        "manual": manual,
-        "by_category": by_category,
-        "by_status": by_status,
-        "by_priority": by_priority
+        "enrichment": ENRICHMENT_QUEUE.stats(),
+        "ingest_queue": await INGEST_QUEUE.stats(db),
+        "ticket_feed": TICKET_FEED.stats(),
     }
 
 if __name__ == "__main__":
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Boolean, Column, Float, Integer, String, Text, DateTime, Index, true
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 Base = declarative_base()
 
@@ -19,9 +19,70 @@ class Ticket(Base):
     status = Column(String(50), default="new")
     summary = Column(Text)
     suggested_reply = Column(Text)
+    # False while summary/suggested_reply are still being generated (see enrichment.py)
+    enriched = Column(Boolean, nullable=False, default=True, server_default=true())
+    # Process that queued the enrichment and when (Unix time), see ingest_service.claim_enrichment
+    enrichment_claim = Column(String(32))
+    enrichment_claimed_at = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Ticket list: newest first, optionally filtered by status (keyset on created_at, id)
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        Index("ix_tickets_status_created_at_id", "status", "created_at", "id"),
+        # Incremental sync: changed since a cursor (keyset on updated_at, id)
+        Index("ix_tickets_updated_at_id", "updated_at", "id"),
+        # Metrics breakdowns
+        Index("ix_tickets_category", "category"),
+        Index("ix_tickets_priority", "priority"),
+        # Abandoned enrichment taken over by the workers
+        Index("ix_tickets_enriched", "enriched"),
+    )
+
+class TicketStat(Base):
+    """Incrementally maintained ticket counters (see stats.py)"""
+    __tablename__ = "ticket_stats"
+
+    dimension = Column(String(20), primary_key=True)  # total / category / status / priority
+    value = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class IngestQueueItem(Base):
+    """Accepted /api/ingest request waiting for the queue consumers (see ingest_queue.py)"""
+    __tablename__ = "ingest_queue"
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)  # IngestRequest JSON
+    state = Column(String(20), nullable=False, default="pending")  # pending / processing / done / failed
+    enqueued_at = Column(Float, nullable=False)  # Unix time, for latency metrics
+    claimed_at = Column(Float)
+    claim = Column(String(32))
+    attempts = Column(Integer, nullable=False, default=0)
+    ticket_id = Column(Integer)
+    result = Column(Text)  # IngestResponse JSON, or the error of a failed item
+    processed_at = Column(Float)
+
+    __table_args__ = (
+        Index("ix_ingest_queue_state_id", "state", "id"),
+        Index("ix_ingest_queue_claim", "claim"),
+    )
+
+class TicketEvent(Base):
+    """Ticket change for the live feed (see ticket_events.py)"""
+    __tablename__ = "ticket_events"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer)  # None for reset
+    kind = Column(String(20), nullable=False)  # created / updated / deleted / reset
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ticket_events_created_at", "created_at"),
+        # Ids are never reused, so a client cursor cannot point at a newer event
+        {"sqlite_autoincrement": True},
+    )
+
 # Pydantic models for API
 class IngestRequest(BaseModel):
     text: str
@@ -34,9 +95,10 @@ class IngestResponse(BaseModel):
     category: str
     priority: str
     department: str
-    summary: str
+    summary: Optional[str] = None
     suggested_reply: Optional[str] = None
     language: str
+    enriched: bool = True
 
 class TicketResponse(BaseModel):
     id: int
@@ -47,13 +109,27 @@ class TicketResponse(BaseModel):
     priority: str
     department: str
     status: str
-    summary: str
-    suggested_reply: str
+    summary: Optional[str] = None
+    suggested_reply: Optional[str] = None
+    enriched: bool = True
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+class QueuedIngestResponse(BaseModel):
+    status: str  # queued / processing / done / failed
+    queue_id: int
+    result: Optional[IngestResponse] = None
+    error: Optional[str] = None
+
+class TicketChanges(BaseModel):
+    tickets: List[Dict[str, Any]]
+    deleted: List[int]
+    cursor: Optional[str] = None
+    has_more: bool = False
+    reset: bool = False
+
 class UpdateStatusRequest(BaseModel):
     status: str
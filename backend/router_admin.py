@@ -0,0 +1,36 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from rules import RulesError, get_rules, reload_rules
+
+router = APIRouter()
+
+def rules_info() -> dict:
+    rules = get_rules()
+    return {
+        "version": rules.version,
+        "generation": rules.generation,
+        "categories": len(rules.category_keywords),
+        "keywords": len(rules.matcher),
+        "templates": len(rules.reply_templates)
+    }
+
+@router.get("/admin/rules")
+async def get_rules_info():
+    """Get version of the active classification rules"""
+    return rules_info()
+
+@router.post("/admin/rules/reload")
+async def reload_rules_file():
+    """
+    Reload rules.json in this worker
+    
+    Other workers pick the change up through the file watcher.
+    On error the previous rules stay active. Reading and compiling the file
+    runs in a thread, like in watch_rules, to keep the event loop free.
+    """
+    try:
+        await asyncio.to_thread(reload_rules)
+    except RulesError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return rules_info()
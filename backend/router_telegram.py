@@ -0,0 +1,65 @@
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import TELEGRAM_WEBHOOK_SECRET
+from database import get_async_db
+from ingest_service import ingest_one
+from models import IngestRequest
+from telegram_messages import (
+    ERROR_MESSAGE, UNKNOWN_STATUS_MESSAGE, format_ingest_reply, greeting_text, is_greeting
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Telegram redelivers an update when the webhook call fails or times out
+RECENT_UPDATES_LIMIT = 1000
+_recent_updates: deque = deque(maxlen=RECENT_UPDATES_LIMIT)
+
+def send_message_reply(chat_id: int, text: str) -> Dict:
+    """sendMessage call returned in the webhook response, no separate API request"""
+    return {"method": "sendMessage", "chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+
+@router.post("/telegram/webhook")
+async def telegram_webhook(
+    update: Dict = Body(...),
+    secret_token: Optional[str] = Header(None, alias="X-Telegram-Bot-Api-Secret-Token"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Receive a Telegram update pushed by the webhook (see telegram_bot.py --set-webhook)
+    
+    The message goes through the ingest pipeline in-process and the reply is
+    returned as a sendMessage method in the response body.
+    """
+    if TELEGRAM_WEBHOOK_SECRET and secret_token != TELEGRAM_WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+    
+    update_id = update.get("update_id")
+    if update_id is not None and update_id in _recent_updates:
+        return {}
+    
+    message = update.get("message") or {}
+    chat_id = message.get("chat", {}).get("id")
+    text = message.get("text")
+    if not chat_id or not text:
+        return {}
+    
+    if is_greeting(text):
+        reply = greeting_text(message.get("from", {}).get("first_name", "User"))
+    else:
+        try:
+            result = await ingest_one(IngestRequest(text=text), db)
+        except Exception as e:
+            logger.error("Webhook ingest failed for chat %s: %s", chat_id, e)
+            return send_message_reply(chat_id, ERROR_MESSAGE)
+        reply = format_ingest_reply(result.model_dump()) or UNKNOWN_STATUS_MESSAGE
+    
+    if update_id is not None:
+        _recent_updates.append(update_id)
+    return send_message_reply(chat_id, reply)
@@ -1,65 +1,324 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Ticket, TicketResponse, UpdateStatusRequest
-from datetime import datetime
+import base64
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Tuple
+from config import TICKET_EVENTS_COMMIT_GRACE
+from database import get_async_db
+from http_cache import epoch_us, make_etag, not_modified, tickets_version, validators
+from models import Ticket, TicketChanges, TicketEvent, TicketResponse, UpdateStatusRequest
+from stats import apply_stats_delta, status_change_delta, ticket_delta
+from ticket_events import FEED_FIELDS, TICKET_FEED, add_ticket_event, settled_head
+from ticket_export import MEDIA_TYPES, export_query, export_tickets
+from datetime import datetime, timedelta
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Columns that can be requested with ?fields=
+TICKET_FIELDS = list(TicketResponse.model_fields)
+# Always selected, they form the keyset cursor
+CURSOR_FIELDS = ["id", "created_at"]
+# Recent changes are held back: updated_at is set before the commit, which can
+# wait for the write lock, so a transaction still open can commit rows with
+# an older updated_at than a cursor already handed out
+CHANGES_SETTLE = timedelta(seconds=TICKET_EVENTS_COMMIT_GRACE)
+
+def encode_cursor(created_at: datetime, ticket_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{ticket_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, ticket_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(ticket_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_changes_cursor(updated_at: datetime, ticket_id: int, event_id: int) -> str:
+    """Cursor of /tickets/changes: (updated_at, id) keyset plus the ticket_events mark"""
+    return encode_cursor(updated_at, ticket_id) + "." + str(event_id)
+
+def decode_changes_cursor(cursor: str) -> Tuple[datetime, int, Optional[int]]:
+    """Decode a cursor of encode_changes_cursor; the mark is None for a cursor without one"""
+    keyset, _, event_id = cursor.partition(".")
+    updated_at, ticket_id = decode_cursor(keyset)
+    if not event_id:
+        return updated_at, ticket_id, None
+    try:
+        return updated_at, ticket_id, int(event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: str) -> List[str]:
+    """Validate a comma-separated ?fields= projection"""
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TICKET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return CURSOR_FIELDS + [name for name in names if name not in CURSOR_FIELDS]
+
+def json_rows(columns: List[str], rows, headers=None) -> Response:
+    """Column tuples encoded straight to a JSON array of objects"""
+    return Response(
+        content=orjson.dumps([dict(zip(columns, row)) for row in rows]),
+        media_type="application/json",
+        headers=headers
+    )
+
 @router.get("/tickets", response_model=List[TicketResponse])
 async def get_tickets(
+    request: Request,
     status: str | None = None,
-    db: Session = Depends(get_db)
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all tickets, optionally filtered by status"""
-    query = db.query(Ticket)
+    """
+    Get tickets newest first, optionally filtered by status
+    
+    Pagination is keyset-based on (created_at, id): pass `limit`, then send
+    the X-Next-Cursor header of the previous page back as `cursor`.
+    `fields` is a comma-separated projection (e.g. `id,subject,status`) that
+    skips loading the columns that are not listed.
+    
+    Rows are selected as plain column tuples and encoded with orjson, which
+    gives the TicketResponse shape without building ORM objects and
+    validating them field by field; response_model documents it.
+    
+    Answers 304 when If-None-Match matches the current version of the
+    tickets table, see http_cache.py.
+    """
+    version, changed_at = await tickets_version(db)
+    etag = make_etag("tickets", version, epoch_us(changed_at))
+    headers = validators(etag, changed_at)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    columns = parse_fields(fields) if fields else TICKET_FIELDS
+    query = select(*[getattr(Ticket, name) for name in columns])
     
     if status:
-        query = query.filter(Ticket.status == status)
+        query = query.where(Ticket.status == status)
+    
+    if cursor:
+        created_at, ticket_id = decode_cursor(cursor)
+        # Row-value comparison lets the (created_at, id) index seek straight to the cursor
+        query = query.where(tuple_(Ticket.created_at, Ticket.id) < tuple_(created_at, ticket_id))
+    
+    query = query.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+    if limit:
+        # One extra row tells whether another page exists
+        query = query.limit(limit + 1)
+    
+    tickets = (await db.execute(query)).all()
+    
+    if limit and len(tickets) > limit:
+        tickets = tickets[:limit]
+        last = tickets[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    
+    return json_rows(columns, tickets, headers)
+
+@router.get("/tickets/events")
+async def ticket_events(
+    cursor: int | None = Query(None, ge=0),
+    last_event_id: int | None = Header(None, ge=0)
+):
+    """
+    Live feed of ticket changes as server-sent events
+    
+    Events: `ticket` (created or updated, with the list fields), `deleted`
+    (ticket id) and `reset` (reload the list). A reconnecting EventSource
+    resumes from its Last-Event-ID; other clients pass the last event id as
+    `cursor`. Without either the stream starts at the current position
+    with a `ready` event. See ticket_events.py.
+    """
+    return StreamingResponse(
+        TICKET_FEED.stream(last_event_id if last_event_id is not None else cursor),
+        media_type="text/event-stream",
+        # No caching or proxy buffering of the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/tickets/changes", response_model=TicketChanges)
+async def get_ticket_changes(
+    since: str | None = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Tickets changed and deleted after a cursor, for incremental sync
+    
+    Send the `cursor` of the previous response back as `since` and repeat
+    while `has_more` is true; without `since` all tickets are returned page
+    by page. `tickets` holds the created or updated tickets with the list
+    fields (or the `fields` projection), `deleted` the ids of tickets
+    removed since the previous response; apply `deleted` first, SQLite can
+    reuse the id of a deleted ticket. `reset` means the changes after
+    `since` are no longer known (the delete events after it were purged,
+    or tickets were bulk imported): reload by syncing again without `since`.
+    
+    Tickets are paged by their (updated_at, id) keyset. Deletes and resets
+    are tracked by a ticket_events id carried in the cursor, taken when the
+    sync starts and moved forward with every page, so an old ticket on a
+    page boundary does not look like an expired cursor.
+    """
+    columns = list(dict.fromkeys(["id", "updated_at"] + (parse_fields(fields) if fields else FEED_FIELDS)))
+    now = datetime.utcnow()
+    upper = now - CHANGES_SETTLE
+    head, _ = await settled_head(db, now)
+    
+    since_at = None
+    mark = head
+    if since:
+        since_at, since_id, mark = decode_changes_cursor(since)
+        if mark is None:
+            # Cursor of an older version, without an event mark
+            return TicketChanges(tickets=[], deleted=[], reset=True)
+        oldest = await db.scalar(select(func.min(TicketEvent.id)))
+        if oldest is not None and mark < oldest - 1:
+            # Events after the mark have been purged
+            return TicketChanges(tickets=[], deleted=[], reset=True)
+        reset = await db.scalar(
+            select(TicketEvent.id)
+            .where(TicketEvent.kind == "reset", TicketEvent.id > mark, TicketEvent.id <= head)
+            .limit(1)
+        )
+        if reset is not None:
+            return TicketChanges(tickets=[], deleted=[], reset=True)
+    
+    query = select(*[getattr(Ticket, name) for name in columns]).where(Ticket.updated_at <= upper)
+    if since_at is not None:
+        query = query.where(tuple_(Ticket.updated_at, Ticket.id) > tuple_(since_at, since_id))
+    query = query.order_by(Ticket.updated_at, Ticket.id).limit(limit + 1)
+    tickets = [dict(row) for row in (await db.execute(query)).mappings()]
+    
+    # A mark from a worker that has seen a newer head stays where it is
+    next_mark = max(mark, head)
+    has_more = len(tickets) > limit
+    if has_more:
+        tickets = tickets[:limit]
+        cursor = encode_changes_cursor(tickets[-1]["updated_at"], tickets[-1]["id"], next_mark)
+    else:
+        # Everything up to the settle bound has been sent
+        cursor = encode_changes_cursor(upper, 0, next_mark)
+    
+    deleted: List[int] = []
+    if next_mark > mark:
+        result = await db.execute(
+            select(TicketEvent.ticket_id)
+            .where(TicketEvent.kind == "deleted", TicketEvent.id > mark, TicketEvent.id <= next_mark)
+            .order_by(TicketEvent.id)
+        )
+        deleted = list(result.scalars())
+    
+    return TicketChanges(tickets=tickets, deleted=deleted, cursor=cursor, has_more=has_more)
+
+@router.get("/tickets/export")
+async def export_ticket_dump(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    fields: str | None = None
+):
+    """
+    Stream all matching tickets as NDJSON or CSV, oldest first
     
-    tickets = query.order_by(Ticket.created_at.desc()).all()
-    return tickets
+    Filters: `status`, and `created_from` (inclusive) / `created_to`
+    (exclusive) on created_at. `fields` is the same projection as in
+    GET /tickets. Rows are read with a server-side cursor, see
+    ticket_export.py.
+    """
+    columns = parse_fields(fields) if fields else TICKET_FIELDS
+    return StreamingResponse(
+        export_tickets(export_query(columns, status, created_from, created_to), columns, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tickets.{fmt}"'}
+    )
 
 @router.get("/tickets/{ticket_id}", response_model=TicketResponse)
-async def get_ticket(ticket_id: int, db: Session = Depends(get_db)):
-    """Get specific ticket by ID"""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+async def get_ticket(
+    ticket_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get specific ticket by ID, 304 when the client's copy is current"""
+    updated_at = await db.scalar(select(Ticket.updated_at).where(Ticket.id == ticket_id))
+    etag = make_etag("ticket", ticket_id, epoch_us(updated_at))
+    headers = validators(etag, updated_at)
+    if updated_at is not None and not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    ticket = await db.get(Ticket, ticket_id)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    response.headers.update(headers)
     return ticket
 
 @router.patch("/tickets/{ticket_id}/status")
 async def update_ticket_status(
     ticket_id: int,
     request: UpdateStatusRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update ticket status"""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    while True:
+        old_status = await db.scalar(select(Ticket.status).where(Ticket.id == ticket_id))
+        if old_status is None:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        
+        # Compare-and-set on the status just read: when a concurrent PATCH
+        # changed it first, re-read so each transition is counted once
+        result = await db.execute(
+            update(Ticket)
+            .where(Ticket.id == ticket_id, Ticket.status == old_status)
+            .values(status=request.status, updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 1:
+            break
     
-    ticket.status = request.status  # type: ignore
-    ticket.updated_at = datetime.utcnow()  # type: ignore
+    await apply_stats_delta(db, status_change_delta(old_status, request.status))
+    add_ticket_event(db, "updated", ticket_id)
     
-    db.commit()
-    db.refresh(ticket)
+    await db.commit()
+    TICKET_FEED.notify()
     
     return {"message": "Status updated", "ticket_id": ticket_id, "status": request.status}
 
 @router.delete("/tickets/{ticket_id}")
-async def delete_ticket(ticket_id: int, db: Session = Depends(get_db)):
+async def delete_ticket(ticket_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete ticket"""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    while True:
+        row = (await db.execute(
+            select(Ticket.category, Ticket.status, Ticket.priority).where(Ticket.id == ticket_id)
+        )).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        
+        # Same compare-and-set as a status change: a concurrent DELETE or
+        # PATCH that got there first leaves no row, so re-read
+        result = await db.execute(
+            delete(Ticket).where(Ticket.id == ticket_id, Ticket.status == row.status)
+        )
+        if result.rowcount == 1:
+            break
     
-    db.delete(ticket)
-    db.commit()
+    await apply_stats_delta(db, ticket_delta(row.category, row.status, row.priority, -1))
+    add_ticket_event(db, "deleted", ticket_id)
+    await db.commit()
+    TICKET_FEED.notify()
     
     return {"message": "Ticket deleted", "ticket_id": ticket_id}
@@ -0,0 +1,134 @@
+"""
+Classification rules loaded from rules.json
+
+Category keywords, priority keywords, reply templates and the Kazakh
+phrase table live in a versioned JSON file instead of code. A loaded file
+is compiled into an immutable Rules snapshot (including the keyword
+automaton) and published with a single reference swap, so every lookup
+sees either the old or the new rules, never half-applied ones. A request
+takes the current snapshot separately for classification, the reply
+template and the Kazakh translation, so a reload that lands in between
+can give those steps different rule versions.
+
+Rules are reloaded by POST /api/admin/rules/reload or by watch_rules(),
+which polls the file modification time in the background.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List
+
+from config import RULES_PATH
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+class RulesError(ValueError):
+    """Rules file is missing or malformed"""
+
+@dataclass(frozen=True)
+class Rules:
+    version: int
+    # Incremented on every successful load, also when the file version is not bumped
+    generation: int
+    category_keywords: Dict[str, List[str]]
+    # Order matters: the first level with a keyword hit wins
+    priority_keywords: Dict[str, List[str]]
+    reply_templates: Dict[str, str]
+    kz_translations: Dict[str, str]
+    matcher: KeywordMatcher
+    mtime: float = 0.0
+
+def _check_word_lists(data: Dict, key: str) -> Dict[str, List[str]]:
+    value = data.get(key)
+    if not isinstance(value, dict) or not all(
+        isinstance(words, list) and all(isinstance(word, str) for word in words)
+        for words in value.values()
+    ):
+        raise RulesError(f"'{key}' must map names to lists of strings")
+    return value
+
+def _check_strings(data: Dict, key: str) -> Dict[str, str]:
+    value = data.get(key)
+    if not isinstance(value, dict) or not all(isinstance(text, str) for text in value.values()):
+        raise RulesError(f"'{key}' must map names to strings")
+    return value
+
+def compile_rules(data: Dict, generation: int = 0, mtime: float = 0.0) -> Rules:
+    """Validate parsed rules and build the matcher structures"""
+    if not isinstance(data, dict):
+        raise RulesError("rules must be a JSON object")
+
+    category_keywords = _check_word_lists(data, "category_keywords")
+    priority_keywords = _check_word_lists(data, "priority_keywords")
+    reply_templates = _check_strings(data, "reply_templates")
+    kz_translations = _check_strings(data, "kz_translations")
+    if "Other" not in reply_templates:
+        raise RulesError("'reply_templates' must contain an 'Other' template")
+
+    matcher = KeywordMatcher({
+        **{("category", name): words for name, words in category_keywords.items()},
+        **{("priority", name): words for name, words in priority_keywords.items()},
+    })
+
+    try:
+        version = int(data.get("version", 0))
+    except (TypeError, ValueError):
+        raise RulesError("'version' must be an integer")
+
+    return Rules(
+        version=version,
+        generation=generation,
+        category_keywords=category_keywords,
+        priority_keywords=priority_keywords,
+        reply_templates=reply_templates,
+        kz_translations=kz_translations,
+        matcher=matcher,
+        mtime=mtime,
+    )
+
+def load_rules(path: str = RULES_PATH, generation: int = 0) -> Rules:
+    """Read and compile a rules file"""
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RulesError(f"cannot read rules from {path}: {e}") from e
+    return compile_rules(data, generation, mtime)
+
+_current = load_rules()
+_reload_lock = threading.Lock()
+
+def get_rules() -> Rules:
+    """Current rules snapshot, keep the reference for lookups that must agree"""
+    return _current
+
+def reload_rules(path: str = RULES_PATH) -> Rules:
+    """Load the rules file and swap it in; the old rules stay active on error"""
+    global _current
+    with _reload_lock:
+        rules = load_rules(path, generation=_current.generation + 1)
+        _current = rules
+    logger.info("Rules v%s loaded (generation %s)", rules.version, rules.generation)
+    return rules
+
+async def watch_rules(interval: float, path: str = RULES_PATH) -> None:
+    """Reload rules whenever the file changes; compilation runs off the event loop"""
+    failed_mtime = None
+    while True:
+        await asyncio.sleep(interval)
+        mtime = None
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime in (_current.mtime, failed_mtime):
+                continue
+            await asyncio.to_thread(reload_rules, path)
+        except (OSError, RulesError) as e:
+            # Report a broken file once, not on every poll
+            failed_mtime = mtime
+            logger.error("Rules reload failed, keeping v%s: %s", _current.version, e)
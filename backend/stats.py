@@ -0,0 +1,172 @@
+"""
+Incrementally maintained ticket metrics
+
+The ticket_stats table holds one counter per (dimension, value) pair:
+the total number of tickets and the counts per category, status and
+priority. Handlers that insert, delete or change the status of tickets
+apply a delta to it in the same transaction, so /api/metrics reads a
+handful of rows instead of aggregating the whole tickets table.
+
+Rebuild or verify the counters from scratch (run from backend/):
+    python stats.py verify
+    python stats.py rebuild
+"""
+
+import sys
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Insert, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Ticket, TicketStat
+
+StatKey = Tuple[str, str]
+
+TOTAL = ("total", "")
+# Ticket column tracked for every breakdown dimension
+DIMENSIONS = {
+    "category": Ticket.category,
+    "status": Ticket.status,
+    "priority": Ticket.priority,
+}
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def ticket_delta(category: str, status: str, priority: str, sign: int = 1) -> Counter:
+    """Counter changes for adding (sign=1) or removing (sign=-1) one ticket"""
+    delta: Counter = Counter()
+    delta[TOTAL] += sign
+    delta[("category", category or "")] += sign
+    delta[("status", status or "")] += sign
+    delta[("priority", priority or "")] += sign
+    return delta
+
+def status_change_delta(old_status: str, new_status: str) -> Counter:
+    """Counter changes for moving one ticket between statuses"""
+    delta: Counter = Counter()
+    if old_status != new_status:
+        delta[("status", old_status or "")] -= 1
+        delta[("status", new_status or "")] += 1
+    return delta
+
+def stats_upsert(dialect: str, delta: Counter) -> Optional[Insert]:
+    """Statement adding delta to the counters, None for an empty delta"""
+    rows = [
+        {"dimension": dimension, "value": value, "count": count}
+        for (dimension, value), count in delta.items() if count
+    ]
+    if not rows:
+        return None
+
+    insert = UPSERT_INSERTS[dialect]
+    stmt = insert(TicketStat).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[TicketStat.dimension, TicketStat.value],
+        set_={"count": TicketStat.count + stmt.excluded.count}
+    )
+
+async def apply_stats_delta(db: AsyncSession, delta: Counter) -> None:
+    """Add delta to the counters within the caller's transaction"""
+    stmt = stats_upsert(db.bind.dialect.name, delta)
+    if stmt is not None:
+        await db.execute(stmt)
+
+async def read_ticket_metrics(db: AsyncSession) -> Dict:
+    """Build the /api/metrics payload from the counters"""
+    result = await db.execute(
+        select(TicketStat).order_by(TicketStat.dimension, TicketStat.value)
+    )
+
+    breakdowns: Dict[str, Dict[str, int]] = {dimension: {} for dimension in DIMENSIONS}
+    total = 0
+    for stat in result.scalars():
+        if (stat.dimension, stat.value) == TOTAL:
+            total = stat.count
+        elif stat.dimension in breakdowns and stat.count > 0:
+            breakdowns[stat.dimension][stat.value] = stat.count
+
+    auto_resolved = breakdowns["status"].get("closed_auto", 0)
+
+    return {
+        "total": total,
+        "auto_resolved": auto_resolved,
+        "manual": total - auto_resolved,
+        "by_category": breakdowns["category"],
+        "by_status": breakdowns["status"],
+        "by_priority": breakdowns["priority"]
+    }
+
+def compute_ticket_stats(db: Session) -> Counter:
+    """Recompute all counters with full-table aggregates"""
+    counts: Counter = Counter()
+    counts[TOTAL] = db.scalar(select(func.count(Ticket.id))) or 0
+    for dimension, column in DIMENSIONS.items():
+        for value, count in db.execute(select(column, func.count(Ticket.id)).group_by(column)):
+            counts[(dimension, value or "")] += count
+    return counts
+
+def stored_ticket_stats(db: Session) -> Counter:
+    """Current counters from ticket_stats, zero entries dropped"""
+    return Counter({
+        (stat.dimension, stat.value): stat.count
+        for stat in db.execute(select(TicketStat)).scalars()
+        if stat.count
+    })
+
+def rebuild_ticket_stats(db: Session) -> Counter:
+    """Replace the counters with freshly computed values"""
+    counts = compute_ticket_stats(db)
+    db.execute(delete(TicketStat))
+    db.add_all(
+        TicketStat(dimension=dimension, value=value, count=count)
+        for (dimension, value), count in counts.items()
+    )
+    db.commit()
+    return counts
+
+def verify_ticket_stats(db: Session) -> Dict[StatKey, Tuple[int, int]]:
+    """Return {key: (stored, actual)} for every counter that is off"""
+    actual = compute_ticket_stats(db)
+    stored = stored_ticket_stats(db)
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(actual.keys() | stored.keys())
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+def ensure_ticket_stats(db: Session) -> None:
+    """Build the counters on first start against an existing database"""
+    has_stats = db.scalar(select(func.count()).select_from(TicketStat))
+    if not has_stats and db.scalar(select(func.count(Ticket.id))):
+        rebuild_ticket_stats(db)
+
+def main(argv) -> int:
+    from database import SessionLocal, init_db
+
+    command = argv[1] if len(argv) > 1 else ""
+    if command not in ("rebuild", "verify"):
+        print(__doc__)
+        return 2
+
+    init_db()
+    with SessionLocal() as db:
+        if command == "rebuild":
+            counts = rebuild_ticket_stats(db)
+            print(f"Rebuilt {len(counts)} counters, {counts[TOTAL]} tickets")
+            return 0
+
+        mismatches = verify_ticket_stats(db)
+        for (dimension, value), (stored, actual) in mismatches.items():
+            print(f"{dimension}:{value or '-'} stored={stored} actual={actual}")
+        print("OK" if not mismatches else f"{len(mismatches)} counters out of sync")
+        return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -6,11 +6,19 @@ Telegram Bot для AI HelpDesk OneWindow
 
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Dict, Optional
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from telegram_messages import (
+    ERROR_MESSAGE, UNKNOWN_STATUS_MESSAGE, format_ingest_reply, greeting_text, is_greeting
+)
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
@@ -18,7 +26,13 @@ load_dotenv()
 # Конфигурация
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "8283540866:AAES_K_VXOOEWh7vOK6JpTD4adnbs6wyMVM")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+# Режим обработки обращений:
+#   "remote" — POST на {BACKEND_URL}/api/ingest
+#   "local"  — конвейер backend вызывается прямо в процессе бота (бот на том же хосте, что и база)
+INGEST_MODE = os.getenv("INGEST_MODE", "remote")
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+# Секрет, которым Telegram подписывает webhook-запросы (заголовок X-Telegram-Bot-Api-Secret-Token)
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
 
 # Логирование
 logging.basicConfig(
@@ -30,6 +44,29 @@ logger = logging.getLogger(__name__)
 # Для отслеживания последнего обработанного обновления (Long Polling offset)
 update_offset = 0
 
+# Число потоков, параллельно обрабатывающих обновления
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+
+# Размер пула keep-alive соединений на один хост (не меньше числа потоков)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(max(10, BOT_WORKERS))))
+
+
+def create_http_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """
+    Создаёт общую HTTP-сессию с пулом keep-alive соединений
+    
+    Все запросы к Telegram API и к backend идут через неё, поэтому TCP и TLS
+    соединения переиспользуются, а не открываются заново на каждый вызов.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+http_session = create_http_session()
+
 
 def validate_config() -> bool:
     """Проверяет, что все необходимые переменные окружения установлены"""
@@ -41,6 +78,10 @@ def validate_config() -> bool:
         logger.error("❌ TELEGRAM_TOKEN пустой!")
         return False
     
+    if INGEST_MODE not in ("remote", "local"):
+        logger.error(f"❌ INGEST_MODE должен быть 'remote' или 'local', получено: {INGEST_MODE}")
+        return False
+    
     logger.info(f"✅ Конфиг загружен. Backend: {BACKEND_URL}")
     return True
 
@@ -64,7 +105,7 @@ def send_message(chat_id: int, text: str) -> bool:
             "parse_mode": "HTML"  # Позволяет использовать HTML теги для форматирования
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = http_session.post(url, json=payload, timeout=10)
         
         if response.status_code == 200:
             logger.info(f"✅ Сообщение отправлено пользователю {chat_id}")
@@ -102,9 +143,77 @@ def detect_language(text: str) -> str:
     return "ru"
 
 
+def ingest_remote(text: str, language: str) -> Optional[Dict]:
+    """
+    Отправляет обращение в backend API (POST /api/ingest)
+    
+    Returns:
+        Ответ backend или None, если backend вернул ошибку
+    """
+    ingest_url = f"{BACKEND_URL}/api/ingest"
+    payload = {
+        "text": text,
+        "language": language
+    }
+    
+    logger.info(f"📤 Отправляю запрос в backend: {ingest_url}")
+    response = http_session.post(ingest_url, json=payload, timeout=10)
+    
+    # 202 — обращение принято в очередь backend (INGEST_QUEUE), результата ещё нет
+    if response.status_code not in (200, 202):
+        logger.error(f"❌ Backend вернул ошибку: {response.status_code} - {response.text}")
+        return None
+    
+    return response.json()
+
+
+_local_ingest = None
+_local_ingest_lock = threading.Lock()
+
+
+def get_local_ingest():
+    """
+    Конвейер backend в процессе бота (INGEST_MODE=local), создаётся при первом вызове
+    
+    Модули backend импортируются только здесь, чтобы в режиме remote боту
+    хватало requests и python-dotenv.
+    """
+    global _local_ingest
+    with _local_ingest_lock:
+        if _local_ingest is None:
+            from ingest_service import LocalIngest
+            _local_ingest = LocalIngest()
+        return _local_ingest
+
+
+def ingest_local(text: str) -> Dict:
+    """
+    Обрабатывает обращение конвейером backend без HTTP-запроса
+    
+    Returns:
+        Результат в том же формате, что и ответ /api/ingest
+    """
+    from models import IngestRequest
+    
+    result = get_local_ingest().ingest(IngestRequest(text=text), timeout=30)
+    return result.model_dump()
+
+
+def ingest_message(text: str, language: str) -> Optional[Dict]:
+    """
+    Передаёт обращение в backend согласно INGEST_MODE
+    
+    Returns:
+        Результат обработки или None, если backend вернул ошибку
+    """
+    if INGEST_MODE == "local":
+        return ingest_local(text)
+    return ingest_remote(text, language)
+
+
 def process_user_message(text: str, chat_id: int) -> bool:
     """
-    Отправляет сообщение пользователя в backend API
+    Отправляет сообщение пользователя в backend (API или в процессе, см. INGEST_MODE)
     Получает ответ и отправляет результат пользователю
     
     Args:
@@ -119,72 +228,30 @@ def process_user_message(text: str, chat_id: int) -> bool:
         language = detect_language(text)
         logger.info(f"📝 Получено сообщение от {chat_id} на языке '{language}': {text[:50]}...")
         
-        # Отправляем в backend API
-        ingest_url = f"{BACKEND_URL}/api/ingest"
-        payload = {
-            "text": text,
-            "language": language
-        }
-        
-        logger.info(f"📤 Отправляю запрос в backend: {ingest_url}")
-        response = requests.post(ingest_url, json=payload, timeout=10)
+        data = ingest_message(text, language)
         
-        if response.status_code != 200:
-            logger.error(f"❌ Backend вернул ошибку: {response.status_code} - {response.text}")
-            error_msg = "❌ Ошибка обработки вашего обращения. Пожалуйста, попробуйте позже."
-            send_message(chat_id, error_msg)
+        if data is None:
+            send_message(chat_id, ERROR_MESSAGE)
             return False
         
-        # Парсим ответ backend
-        data = response.json()
         status = data.get("status")
         
         logger.info(f"📥 Backend ответил со статусом: {status}")
         
-        # ==================== ВАРИАНТ 1: AUTO-RESOLVE ====================
-        if status == "closed_auto":
-            answer = data.get("answer", "Ответ не найден")
-            similarity = data.get("similarity_score", 0)
-            
-            # Форматируем ответ для пользователя
-            reply_text = (
-                f"🤖 <b>Автоматическое решение:</b>\n\n"
-                f"{answer}\n\n"
-                f"<i>(Уверенность: {similarity*100:.0f}%)</i>"
-            )
-            
-            send_message(chat_id, reply_text)
-            logger.info(f"✅ Auto-resolve отправлен пользователю {chat_id}")
-            return True
-        
-        # ==================== ВАРИАНТ 2: CREATION TICKET ====================
-        elif status == "new":
-            ticket_id = data.get("ticket_id")
-            category = data.get("category", "N/A")
-            priority = data.get("priority", "N/A")
-            department = data.get("department", "N/A")
-            suggested_reply = data.get("suggested_reply", "Ваш запрос обрабатывается...")
-            
-            # Форматируем информацию о тикете
-            reply_text = (
-                f"📝 <b>Ваш запрос зарегистрирован!</b>\n\n"
-                f"<b>ID тикета:</b> #{ticket_id}\n"
-                f"<b>Категория:</b> {category}\n"
-                f"<b>Приоритет:</b> {priority}\n"
-                f"<b>Отдел:</b> {department}\n\n"
-                f"<i>Наш специалист скоро ответит!</i>"
-            )
-            
-            send_message(chat_id, reply_text)
-            logger.info(f"✅ Тикет #{ticket_id} создан, пользователь {chat_id} уведомлен")
-            return True
+        reply_text = format_ingest_reply(data)
         
-        else:
+        if reply_text is None:
             logger.warning(f"⚠️ Неизвестный статус от backend: {status}")
-            unknown_msg = "⚠️ Неизвестный статус ответа. Пожалуйста, обратитесь в поддержку."
-            send_message(chat_id, unknown_msg)
+            send_message(chat_id, UNKNOWN_STATUS_MESSAGE)
             return False
         
+        send_message(chat_id, reply_text)
+        if status == "closed_auto":
+            logger.info(f"✅ Auto-resolve отправлен пользователю {chat_id}")
+        else:
+            logger.info(f"✅ Тикет #{data.get('ticket_id')} создан, пользователь {chat_id} уведомлен")
+        return True
+        
     except requests.exceptions.RequestException as e:
         logger.error(f"❌ Ошибка подключения к backend: {e}")
         error_msg = "❌ Не удалось подключиться к серверу. Пожалуйста, попробуйте позже."
@@ -222,7 +289,7 @@ def get_updates(offset: int = 0) -> Dict:
             "allowed_updates": ["message"]  # Получаем только message обновления
         }
         
-        response = requests.get(url, params=params, timeout=110)  # timeout должен быть больше чем timeout на сервере
+        response = http_session.get(url, params=params, timeout=110)  # timeout должен быть больше чем timeout на сервере
         
         if response.status_code == 200:
             return response.json()
@@ -243,10 +310,177 @@ def get_updates(offset: int = 0) -> Dict:
         return {"ok": False, "result": []}
 
 
+def set_webhook(url: str, secret: Optional[str] = None) -> bool:
+    """
+    Переключает бота на webhook: Telegram будет присылать обновления POST-запросами
+    
+    Args:
+        url: Публичный адрес маршрута /api/telegram/webhook
+        secret: Значение заголовка X-Telegram-Bot-Api-Secret-Token
+    
+    Returns:
+        True если Telegram принял webhook
+    """
+    payload = {"url": url, "allowed_updates": ["message"]}
+    if secret:
+        payload["secret_token"] = secret
+    
+    response = http_session.post(f"{TELEGRAM_API_URL}/setWebhook", json=payload, timeout=10)
+    logger.info(f"🔗 setWebhook: {response.status_code} - {response.text}")
+    return response.status_code == 200 and response.json().get("ok", False)
+
+
+def delete_webhook() -> bool:
+    """Отключает webhook, чтобы снова работал getUpdates (Long Polling)"""
+    response = http_session.post(f"{TELEGRAM_API_URL}/deleteWebhook", timeout=10)
+    logger.info(f"🔗 deleteWebhook: {response.status_code} - {response.text}")
+    return response.status_code == 200 and response.json().get("ok", False)
+
+
+def handle_update(update: Dict) -> None:
+    """
+    Обрабатывает одно обновление Telegram: приветствие или обращение
+    
+    Args:
+        update: Объект Update из getUpdates
+    """
+    message = update.get("message")
+    
+    if not message:
+        return
+    
+    chat_id = message.get("chat", {}).get("id")
+    text = message.get("text")
+    user_first_name = message.get("from", {}).get("first_name", "User")
+    
+    if not chat_id or not text:
+        logger.warning("⚠️ Пустое сообщение или ID чата")
+        return
+    
+    logger.info(f"👤 Сообщение от {user_first_name} (ID: {chat_id}): {text[:30]}...")
+    
+    # Приветствие (опционально)
+    if is_greeting(text):
+        send_message(chat_id, greeting_text(user_first_name))
+    else:
+        # Обрабатываем обычное сообщение
+        process_user_message(text, chat_id)
+
+
+class UpdateDispatcher:
+    """
+    Параллельная обработка обновлений пулом потоков
+    
+    - Сообщения одного chat_id обрабатываются строго по порядку, разные
+      чаты обрабатываются параллельно.
+    - offset сдвигается только по непрерывному префиксу завершённых
+      обновлений: если бот упадёт, незавершённые обновления Telegram
+      доставит повторно.
+    - Повторно доставленные обновления, которые ещё в работе, пропускаются.
+    """
+    
+    def __init__(self, handler: Callable[[Dict], None], workers: int = 8,
+                 offset: int = 0, max_pending: int = 1000):
+        self.handler = handler
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="update")
+        self._cond = threading.Condition()
+        self._offset = offset
+        # update_id в порядке поступления и уже завершённые из них
+        self._inflight: Deque[int] = deque()
+        self._inflight_ids: Set[int] = set()
+        self._completed: Set[int] = set()
+        # Очередь обновлений каждого чата; чат в словаре — значит его очередь обрабатывается
+        self._chat_queues: Dict[Any, Deque[Dict]] = {}
+    
+    @property
+    def offset(self) -> int:
+        """Offset для getUpdates: все обновления до него обработаны"""
+        with self._cond:
+            return self._offset
+    
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._inflight)
+    
+    def submit(self, update: Dict) -> bool:
+        """
+        Ставит обновление в очередь его чата
+        
+        Returns:
+            False если обновление уже обработано или ещё в работе
+        """
+        update_id = update.get("update_id")
+        chat_id = (update.get("message") or {}).get("chat", {}).get("id")
+        
+        with self._cond:
+            if update_id is not None:
+                if update_id < self._offset or update_id in self._inflight_ids:
+                    return False
+                # Ограничиваем число обновлений в работе
+                while len(self._inflight) >= self.max_pending:
+                    self._cond.wait()
+                self._inflight.append(update_id)
+                self._inflight_ids.add(update_id)
+            
+            queue = self._chat_queues.get(chat_id)
+            if queue is not None:
+                queue.append(update)
+                return True
+            self._chat_queues[chat_id] = deque([update])
+        
+        self._executor.submit(self._drain_chat, chat_id)
+        return True
+    
+    def _drain_chat(self, chat_id: Any) -> None:
+        while True:
+            with self._cond:
+                queue = self._chat_queues[chat_id]
+                if not queue:
+                    del self._chat_queues[chat_id]
+                    return
+                update = queue[0]
+            
+            try:
+                self.handler(update)
+            except Exception as e:
+                logger.error(f"❌ Ошибка при обработке обновления: {e}")
+            
+            with self._cond:
+                queue.popleft()
+                self._complete(update.get("update_id"))
+    
+    def _complete(self, update_id: Optional[int]) -> None:
+        if update_id is None:
+            return
+        self._completed.add(update_id)
+        while self._inflight and self._inflight[0] in self._completed:
+            done = self._inflight.popleft()
+            self._completed.discard(done)
+            self._inflight_ids.discard(done)
+            self._offset = max(self._offset, done + 1)
+        self._cond.notify_all()
+    
+    def wait_for_progress(self, offset: int, timeout: float) -> None:
+        """Ждёт, пока offset не сдвинется дальше указанного (или timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._offset > offset or not self._inflight, timeout)
+    
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт завершения всех обновлений в работе"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._inflight, timeout)
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
 def main():
     """
     Основной цикл бота
-    Использует Long Polling для получения обновлений
+    Использует Long Polling для получения обновлений,
+    обработка идёт параллельно в UpdateDispatcher
     """
     global update_offset
     
@@ -254,14 +488,21 @@ def main():
         return
     
     logger.info("🤖 Telegram bot started...")
-    logger.info(f"Backend URL: {BACKEND_URL}")
-    logger.info("📡 Подключение к Telegram API через Long Polling...")
+    if INGEST_MODE == "local":
+        logger.info("Backend: локальный конвейер (INGEST_MODE=local)")
+        get_local_ingest()
+    else:
+        logger.info(f"Backend URL: {BACKEND_URL}")
+    logger.info(f"📡 Подключение к Telegram API через Long Polling ({BOT_WORKERS} обработчиков)...")
+    
+    dispatcher = UpdateDispatcher(handle_update, workers=BOT_WORKERS, offset=update_offset)
     
     # Основной цикл
     while True:
         try:
             # Получаем обновления (блокирующий вызов с timeout=100)
-            updates_response = get_updates(offset=update_offset)
+            offset = dispatcher.offset
+            updates_response = get_updates(offset=offset)
             
             if not updates_response.get("ok"):
                 logger.warning("⚠️ Ошибка получения обновлений, переподключение...")
@@ -270,58 +511,17 @@ def main():
             
             updates = updates_response.get("result", [])
             
-            if updates:
-                logger.info(f"📬 Получено {len(updates)} обновлений")
+            # Передаём обновления в пул; уже находящиеся в работе пропускаются
+            new_updates = sum(1 for update in updates if dispatcher.submit(update))
+            
+            if new_updates:
+                logger.info(f"📬 Получено {new_updates} обновлений (в работе: {dispatcher.pending})")
+            elif updates:
+                # Telegram вернул только необработанные до конца обновления —
+                # ждём прогресса, а не опрашиваем API в холостую
+                dispatcher.wait_for_progress(offset, timeout=5)
             
-            # Обрабатываем каждое обновление
-            for update in updates:
-                try:
-                    update_id = update.get("update_id")
-                    message = update.get("message")
-                    
-                    if not message:
-                        continue
-                    
-                    chat_id = message.get("chat", {}).get("id")
-                    text = message.get("text")
-                    user_first_name = message.get("from", {}).get("first_name", "User")
-                    
-                    if not chat_id or not text:
-                        logger.warning("⚠️ Пустое сообщение или ID чата")
-                        continue
-                    
-                    logger.info(f"👤 Сообщение от {user_first_name} (ID: {chat_id}): {text[:30]}...")
-                    
-                    # Приветствие (опционально)
-                    if text.lower() in ["/start", "привет", "привет!", "hello", "привет"]:
-                        greeting = (
-                            f"👋 Привет, <b>{user_first_name}</b>!\n\n"
-                            f"Я помощник AI HelpDesk OneWindow.\n"
-                            f"Просто напиши мне свою проблему, и я помогу её решить! 🚀"
-                        )
-                        send_message(chat_id, greeting)
-                    else:
-                        # Обрабатываем обычное сообщение
-                        process_user_message(text, chat_id)
-                    
-                    # Обновляем offset для следующего запроса
-                    try:
-                        if update_id is not None:
-                            update_offset = update_id + 1
-                    except NameError:
-                        # update_id не определен — безопасно пропускаем
-                        pass
-
-                except Exception as e:
-                    logger.error(f"❌ Ошибка при обработке обновления: {e}")
-                    # Безопасно обновляем offset, если update_id доступен
-                    uid = locals().get('update_id')
-                    if uid is not None:
-                        try:
-                            update_offset = uid + 1
-                        except Exception:
-                            pass
-                    continue
+            update_offset = dispatcher.offset
         
         except KeyboardInterrupt:
             logger.info("⏹️ Бот остановлен пользователем (Ctrl+C)")
@@ -332,7 +532,23 @@ def main():
             logger.info("🔄 Переподключение через 5 секунд...")
             time.sleep(5)
             continue
+    
+    dispatcher.shutdown()
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Telegram bot AI HelpDesk OneWindow")
+    parser.add_argument("--set-webhook", metavar="URL",
+                        help="зарегистрировать webhook (https://host/api/telegram/webhook) и выйти")
+    parser.add_argument("--delete-webhook", action="store_true",
+                        help="удалить webhook и выйти")
+    args = parser.parse_args()
+    
+    if args.set_webhook:
+        set_webhook(args.set_webhook, TELEGRAM_WEBHOOK_SECRET)
+    elif args.delete_webhook:
+        delete_webhook()
+    else:
+        main()
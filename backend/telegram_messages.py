@@ -0,0 +1,81 @@
+"""
+Тексты ответов Telegram-бота
+
+Общие для long polling (telegram_bot.py) и webhook (router_telegram.py)
+"""
+
+from typing import Dict, Optional
+
+# Сообщения, на которые бот отвечает приветствием
+GREETING_COMMANDS = {"/start", "привет", "привет!", "hello"}
+
+ERROR_MESSAGE = "❌ Ошибка обработки вашего обращения. Пожалуйста, попробуйте позже."
+UNKNOWN_STATUS_MESSAGE = "⚠️ Неизвестный статус ответа. Пожалуйста, обратитесь в поддержку."
+
+
+def is_greeting(text: str) -> bool:
+    """Проверяет, является ли сообщение приветствием"""
+    return text.lower() in GREETING_COMMANDS
+
+
+def greeting_text(first_name: str) -> str:
+    """
+    Формирует приветствие
+    
+    Args:
+        first_name: Имя пользователя в Telegram
+    
+    Returns:
+        Текст приветствия (HTML)
+    """
+    return (
+        f"👋 Привет, <b>{first_name}</b>!\n\n"
+        f"Я помощник AI HelpDesk OneWindow.\n"
+        f"Просто напиши мне свою проблему, и я помогу её решить! 🚀"
+    )
+
+
+def format_ingest_reply(data: Dict) -> Optional[str]:
+    """
+    Формирует ответ пользователю по результату /api/ingest
+    
+    Args:
+        data: Ответ backend (поля IngestResponse)
+    
+    Returns:
+        Текст ответа (HTML) или None для неизвестного статуса
+    """
+    status = data.get("status")
+    
+    # ==================== ВАРИАНТ 1: AUTO-RESOLVE ====================
+    if status == "closed_auto":
+        answer = data.get("answer") or "Ответ не найден"
+        similarity = data.get("similarity_score") or 0
+        
+        return (
+            f"🤖 <b>Автоматическое решение:</b>\n\n"
+            f"{answer}\n\n"
+            f"<i>(Уверенность: {similarity*100:.0f}%)</i>"
+        )
+    
+    # ==================== ВАРИАНТ 2: CREATION TICKET ====================
+    if status == "new":
+        return (
+            f"📝 <b>Ваш запрос зарегистрирован!</b>\n\n"
+            f"<b>ID тикета:</b> #{data.get('ticket_id')}\n"
+            f"<b>Категория:</b> {data.get('category', 'N/A')}\n"
+            f"<b>Приоритет:</b> {data.get('priority', 'N/A')}\n"
+            f"<b>Отдел:</b> {data.get('department', 'N/A')}\n\n"
+            f"<i>Наш специалист скоро ответит!</i>"
+        )
+    
+    # ==================== ВАРИАНТ 3: ПРИНЯТО В ОЧЕРЕДЬ ====================
+    # "processing": запрос уже взят воркером, но ещё не обработан
+    if status in ("queued", "processing"):
+        return (
+            f"📥 <b>Ваше обращение принято!</b>\n\n"
+            f"<b>Номер в очереди:</b> {data.get('queue_id')}\n\n"
+            f"<i>Сейчас много обращений, мы обработаем его в ближайшее время.</i>"
+        )
+    
+    return None
@@ -0,0 +1,301 @@
+"""
+Live ticket feed
+
+Handlers that create, change or delete tickets add a row to ticket_events
+in the same transaction (add_ticket_event) and call TICKET_FEED.notify()
+after the commit. One poller per worker process reads new rows, renders
+them as server-sent events into a small in-memory buffer and wakes the
+open GET /api/tickets/events streams, so the database is queried once per
+change, not once per connected operator. Rows written by other processes
+are picked up every POLL_INTERVAL seconds.
+
+The SSE id is the event id: a reconnecting EventSource resumes after the
+last event it received (Last-Event-ID header), other clients pass
+?cursor=. A cursor that is older than the buffer is served from the table;
+one that is older than the retained events (TICKET_EVENTS_RETENTION) or
+unknown gets a "reset" event, after which the client reloads the list.
+
+Readers only move past events up to settled_head(). SQLite assigns ids
+under the write lock, so they become visible in id order. PostgreSQL takes
+them from a sequence at insert time, and an event can commit after one
+with a higher id. The events after an id gap are therefore held back until
+the gap is filled, or until it is older than TICKET_EVENTS_COMMIT_GRACE
+and counts as a rolled back transaction.
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import TICKET_EVENTS_COMMIT_GRACE, TICKET_EVENTS_RETENTION
+from database import AsyncSessionLocal
+from models import Ticket, TicketEvent
+
+logger = logging.getLogger(__name__)
+
+# Ticket columns sent with created/updated events: the list view, without
+# the large body and suggested_reply
+FEED_FIELDS = [
+    "id", "subject", "language", "category", "priority", "department", "status",
+    "summary", "enriched", "created_at", "updated_at",
+]
+# Seconds between checks for events written by other processes
+POLL_INTERVAL = 1.0
+# Seconds of silence after which a stream sends a keepalive comment
+KEEPALIVE_INTERVAL = 15.0
+# Milliseconds an EventSource waits before reconnecting
+RETRY_MS = 3000
+# Rendered events kept in memory for the streams of this process
+BUFFER_SIZE = 1000
+# Events read per query
+READ_BATCH = 500
+# Seconds between purges of old events
+PURGE_INTERVAL = 3600.0
+
+Message = Tuple[int, str]
+
+def add_ticket_event(db, kind: str, ticket_id: Optional[int] = None) -> None:
+    """Record a change in the caller's transaction (sync or async session)"""
+    db.add(TicketEvent(ticket_id=ticket_id, kind=kind))
+
+def reset_event_statement():
+    """INSERT of a reset event, for bulk writers that bypass the ORM"""
+    return insert(TicketEvent).values(kind="reset", created_at=datetime.utcnow())
+
+def sse_message(event: str, event_id: int, data: Dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def settled_head(db: AsyncSession, now: Optional[datetime] = None) -> Tuple[int, Optional[datetime]]:
+    """
+    Id and time of the newest event that no uncommitted event precedes
+    
+    (0, None) before the first event. Every id up to the head is either
+    visible or older than the commit grace.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=TICKET_EVENTS_COMMIT_GRACE)
+    # Sorted here: with ORDER BY id SQLite scans the whole table instead of
+    # the created_at index
+    recent = sorted((await db.execute(
+        select(TicketEvent.id, TicketEvent.created_at).where(TicketEvent.created_at > cutoff)
+    )).all())
+    # Settled by age: the newest event before the recent ones
+    base = select(TicketEvent.id, TicketEvent.created_at).order_by(TicketEvent.id.desc()).limit(1)
+    if recent:
+        base = base.where(TicketEvent.id < recent[0][0])
+    row = (await db.execute(base)).first()
+    head, head_at = (row[0], row[1]) if row else (0, None)
+    for event_id, created_at in recent:
+        if event_id != head + 1:
+            break
+        head, head_at = event_id, created_at
+    return head, head_at
+
+async def read_events(
+    db: AsyncSession, after: int, limit: int = READ_BATCH, upto: Optional[int] = None
+) -> Tuple[List[Message], int]:
+    """Rendered events after the cursor (up to upto) and the id of the last event read"""
+    query = select(TicketEvent).where(TicketEvent.id > after)
+    if upto is not None:
+        query = query.where(TicketEvent.id <= upto)
+    result = await db.execute(query.order_by(TicketEvent.id).limit(limit))
+    events = result.scalars().all()
+    if not events:
+        return [], after
+
+    ticket_ids = {event.ticket_id for event in events if event.kind in ("created", "updated")}
+    tickets = {}
+    if ticket_ids:
+        result = await db.execute(
+            select(*[getattr(Ticket, name) for name in FEED_FIELDS]).where(Ticket.id.in_(ticket_ids))
+        )
+        tickets = {row["id"]: jsonable_encoder(dict(row)) for row in result.mappings()}
+
+    messages = []
+    for event in events:
+        if event.kind == "deleted":
+            messages.append((event.id, sse_message("deleted", event.id, {"id": event.ticket_id})))
+        elif event.kind == "reset":
+            messages.append((event.id, sse_message("reset", event.id, {})))
+        elif event.ticket_id in tickets:
+            # A ticket deleted in the meantime is followed by its deleted event
+            data = {"kind": event.kind, "ticket": tickets[event.ticket_id]}
+            messages.append((event.id, sse_message("ticket", event.id, data)))
+    return messages, events[-1].id
+
+class TicketFeed:
+    def __init__(self, buffer_size: int = BUFFER_SIZE, retention: float = TICKET_EVENTS_RETENTION):
+        self.retention = retention
+        self._buffer: Deque[Message] = deque(maxlen=buffer_size)
+        # Last event id read by the poller, the buffer holds events after _buffer_start
+        self._head = 0
+        self._buffer_start = 0
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._poller: Optional[asyncio.Task] = None
+        self._closed = False
+        self._last_purge = 0.0
+        self.streams = 0
+
+    async def start(self) -> None:
+        # Bound to the running loop
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        async with AsyncSessionLocal() as db:
+            self._head = self._buffer_start = (await settled_head(db))[0]
+        self._closed = False
+        self._poller = asyncio.create_task(self._run())
+
+    def close_on_signals(self) -> None:
+        """
+        End the open streams as soon as the server is asked to exit
+        
+        uvicorn waits for open responses before it runs the shutdown
+        handlers, so stop() alone would come too late. The handlers installed
+        before (uvicorn's) still run.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue
+            
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self._close)
+                previous(signum, frame)
+            
+            try:
+                signal.signal(signum, handler)
+            except ValueError:
+                # Not the main thread, e.g. under TestClient
+                return
+
+    def _close(self) -> None:
+        self._closed = True
+        self._broadcast()
+
+    async def stop(self) -> None:
+        """Stop the poller and end the open streams"""
+        self._close()
+        if self._poller:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+
+    def notify(self) -> None:
+        """Read new events right away, called after committing them"""
+        self._wakeup.set()
+
+    def _broadcast(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+                if time.time() - self._last_purge > PURGE_INTERVAL:
+                    self._last_purge = time.time()
+                    async with AsyncSessionLocal() as db:
+                        await self.purge(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ticket feed poll error: %s", e)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self) -> None:
+        """Move new events into the buffer and wake the streams"""
+        advanced = False
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                upto, _ = await settled_head(db)
+                while True:
+                    messages, head = await read_events(db, self._head, upto=upto)
+                    for message in messages:
+                        if len(self._buffer) == self._buffer.maxlen:
+                            self._buffer_start = self._buffer[0][0]
+                        self._buffer.append(message)
+                    if head == self._head:
+                        break
+                    self._head = head
+                    advanced = True
+        if advanced:
+            self._broadcast()
+
+    async def _resumable(self, cursor: int) -> bool:
+        """Whether every event after the cursor is still available"""
+        if cursor > self._head:
+            # The client may have seen an event this process has not read yet
+            await self.poll()
+        if cursor > self._head:
+            return False
+        if cursor >= self._buffer_start:
+            return True
+        async with AsyncSessionLocal() as db:
+            oldest = await db.scalar(select(func.min(TicketEvent.id)))
+        return oldest is not None and cursor >= oldest - 1
+
+    async def stream(self, cursor: Optional[int]) -> AsyncIterator[str]:
+        """Server-sent events after the cursor, then live events until the client leaves"""
+        self.streams += 1
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if cursor is None:
+                cursor = self._head
+                yield sse_message("ready", cursor, {"cursor": cursor})
+            elif not await self._resumable(cursor):
+                cursor = self._head
+                yield sse_message("reset", cursor, {})
+
+            while not self._closed:
+                if cursor < self._buffer_start:
+                    # Catch up from the table on events that already left the buffer
+                    async with AsyncSessionLocal() as db:
+                        messages, last = await read_events(db, cursor, min(READ_BATCH, self._buffer_start - cursor))
+                    if messages:
+                        yield "".join(message for _, message in messages)
+                    cursor = last if last > cursor else self._buffer_start
+                    continue
+
+                changed = self._changed
+                pending = [message for event_id, message in self._buffer if event_id > cursor]
+                cursor = max(cursor, self._head)
+                if pending:
+                    yield "".join(pending)
+                try:
+                    await asyncio.wait_for(changed.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.streams -= 1
+
+    async def purge(self, db: AsyncSession) -> int:
+        """Delete events older than the retention, the newest one is always kept"""
+        result = await db.execute(
+            delete(TicketEvent).where(
+                TicketEvent.created_at < datetime.utcnow() - timedelta(seconds=self.retention),
+                TicketEvent.id < self._head
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    def stats(self) -> Dict:
+        return {"running": self._poller is not None, "streams": self.streams, "cursor": self._head}
+
+TICKET_FEED = TicketFeed()
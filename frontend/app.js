@@ -1,7 +1,19 @@
 const API_BASE = 'http://localhost:8000/api';
+const TICKETS_PAGE_SIZE = 50;
+// Large text columns (body, suggested_reply) are loaded only in ticket detail
+const TICKET_LIST_FIELDS = 'id,subject,language,category,priority,department,status,summary,created_at';
+// Shown while summary / suggested reply are generated in the background
+const PENDING_TEXT = '⏳ Формируется...';
 
 let currentTickets = [];
 let currentTicket = null;
+let nextTicketsCursor = null;
+
+// Live ticket feed (server-sent events): the list is patched instead of reloaded
+const FEED_RECONNECT_MS = 5000;
+let ticketFeed = null;
+let lastFeedEventId = null;
+let metricsReloadTimer = null;
 
 // Tab switching
 function showTab(tabName) {
@@ -25,33 +37,57 @@ function showTab(tabName) {
     }
 }
 
-// Load tickets
-async function loadTickets() {
+// Load tickets (first page, or the next page when append is true)
+async function loadTickets(append = false) {
     const listEl = document.getElementById('tickets-list');
-    listEl.innerHTML = '<p class="loading">Загрузка тикетов...</p>';
+    const moreBtn = document.getElementById('load-more-btn');
+    if (!append) {
+        listEl.innerHTML = '<p class="loading">Загрузка тикетов...</p>';
+        nextTicketsCursor = null;
+    }
+    moreBtn.style.display = 'none';
 
     try {
+        const params = new URLSearchParams({
+            limit: TICKETS_PAGE_SIZE,
+            fields: TICKET_LIST_FIELDS
+        });
         const statusFilter = document.getElementById('status-filter').value;
-        const url = statusFilter 
-            ? `${API_BASE}/tickets?status=${statusFilter}`
-            : `${API_BASE}/tickets`;
+        if (statusFilter) {
+            params.set('status', statusFilter);
+        }
+        if (append && nextTicketsCursor) {
+            params.set('cursor', nextTicketsCursor);
+        }
 
-        const response = await fetch(url);
+        const response = await fetch(`${API_BASE}/tickets?${params}`);
         const tickets = await response.json();
 
-        currentTickets = tickets;
+        nextTicketsCursor = response.headers.get('X-Next-Cursor');
+        currentTickets = append ? currentTickets.concat(tickets) : tickets;
 
-        if (tickets.length === 0) {
+        if (currentTickets.length === 0) {
             listEl.innerHTML = '<p class="loading">Тикетов не найдено</p>';
             return;
         }
 
-        listEl.innerHTML = tickets.map(ticket => createTicketCard(ticket)).join('');
+        const cards = tickets.map(ticket => createTicketCard(ticket)).join('');
+        if (append) {
+            listEl.insertAdjacentHTML('beforeend', cards);
+        } else {
+            listEl.innerHTML = cards;
+        }
+        moreBtn.style.display = nextTicketsCursor ? 'block' : 'none';
     } catch (error) {
         listEl.innerHTML = `<p class="loading" style="color: #dc3545;">Ошибка загрузки: ${error.message}</p>`;
     }
 }
 
+// Load next page of tickets
+function loadMoreTickets() {
+    loadTickets(true);
+}
+
 // Create ticket card HTML
 function createTicketCard(ticket) {
     const priorityClass = `priority-${ticket.priority}`;
@@ -66,7 +102,7 @@ function createTicketCard(ticket) {
     };
 
     return `
-        <div class="ticket-card" onclick="showTicketDetail(${ticket.id})">
+        <div class="ticket-card" data-ticket-id="${ticket.id}" onclick="showTicketDetail(${ticket.id})">
             <div class="ticket-header">
                 <span class="ticket-id">#${ticket.id}</span>
                 <span class="ticket-status ${statusClass}">${statusLabels[ticket.status]}</span>
@@ -80,16 +116,24 @@ function createTicketCard(ticket) {
                 <span>🕐 ${date}</span>
             </div>
             <div style="margin-top: 10px; color: #6c757d; font-size: 0.9rem;">
-                ${ticket.summary}
+                ${ticket.summary ?? PENDING_TEXT}
             </div>
         </div>
     `;
 }
 
 // Show ticket detail
-function showTicketDetail(ticketId) {
-    const ticket = currentTickets.find(t => t.id === ticketId);
-    if (!ticket) return;
+async function showTicketDetail(ticketId) {
+    // The list holds only the projected fields, fetch the full ticket
+    let ticket;
+    try {
+        const response = await fetch(`${API_BASE}/tickets/${ticketId}`);
+        if (!response.ok) return;
+        ticket = await response.json();
+    } catch (error) {
+        alert(`Ошибка: ${error.message}`);
+        return;
+    }
 
     currentTicket = ticket;
 
@@ -140,10 +184,10 @@ function showTicketDetail(ticketId) {
             <p style="white-space: pre-wrap; background: #f8f9fa; padding: 15px; border-radius: 6px;">${ticket.body}</p>
 
             <h3>📋 Резюме</h3>
-            <p style="background: #e7f3ff; padding: 15px; border-radius: 6px; border-left: 4px solid #667eea;">${ticket.summary}</p>
+            <p style="background: #e7f3ff; padding: 15px; border-radius: 6px; border-left: 4px solid #667eea;">${ticket.summary ?? PENDING_TEXT}</p>
 
             <h3>💬 Предложенный ответ</h3>
-            <p style="background: #d4edda; padding: 15px; border-radius: 6px; border-left: 4px solid #28a745; white-space: pre-wrap;">${ticket.suggested_reply}</p>
+            <p style="background: #d4edda; padding: 15px; border-radius: 6px; border-left: 4px solid #28a745; white-space: pre-wrap;">${ticket.suggested_reply ?? PENDING_TEXT}</p>
 
             ${ticket.status !== 'closed' && ticket.status !== 'closed_auto' ? `
                 <div class="action-buttons">
@@ -183,7 +227,10 @@ async function updateTicketStatus(newStatus) {
         if (response.ok) {
             alert('Статус обновлён');
             closeTicketDetail();
-            loadTickets();
+            // With the live feed the card is updated by its event
+            if (!isTicketFeedOpen()) {
+                loadTickets();
+            }
         } else {
             alert('Ошибка обновления статуса');
         }
@@ -221,7 +268,13 @@ async function submitRequest(event) {
         if (response.ok) {
             resultEl.className = 'result-box success';
             
-            if (result.status === 'closed_auto') {
+            if (result.status === 'queued' || result.status === 'processing') {
+                resultEl.innerHTML = `
+                    <h3>📥 Обращение принято в очередь</h3>
+                    <p><strong>Номер в очереди:</strong> ${result.queue_id}</p>
+                    <p>Сейчас много обращений, тикет будет создан в ближайшее время.</p>
+                `;
+            } else if (result.status === 'closed_auto') {
                 resultEl.innerHTML = `
                     <h3>✅ Обращение решено автоматически!</h3>
                     <p><strong>Тикет:</strong> #${result.ticket_id}</p>
@@ -238,7 +291,7 @@ async function submitRequest(event) {
                     <p><strong>Категория:</strong> ${result.category}</p>
                     <p><strong>Приоритет:</strong> ${result.priority}</p>
                     <p><strong>Отдел:</strong> ${result.department}</p>
-                    <p><strong>Резюме:</strong> ${result.summary}</p>
+                    <p><strong>Резюме:</strong> ${result.summary ?? PENDING_TEXT}</p>
                 `;
             }
 
@@ -255,10 +308,12 @@ async function submitRequest(event) {
     resultEl.style.display = 'block';
 }
 
-// Load metrics
-async function loadMetrics() {
+// Load metrics (quiet: keep the current numbers on screen while loading)
+async function loadMetrics(quiet = false) {
     const contentEl = document.getElementById('metrics-content');
-    contentEl.innerHTML = '<p class="loading">Загрузка метрик...</p>';
+    if (!quiet) {
+        contentEl.innerHTML = '<p class="loading">Загрузка метрик...</p>';
+    }
 
     try {
         const response = await fetch(`${API_BASE}/metrics`);
@@ -333,9 +388,105 @@ async function loadMetrics() {
     }
 }
 
+// Connect to the live ticket feed, resuming after the last event received
+function connectTicketFeed() {
+    if (!window.EventSource) {
+        return;
+    }
+    const params = lastFeedEventId !== null ? `?cursor=${lastFeedEventId}` : '';
+    ticketFeed = new EventSource(`${API_BASE}/tickets/events${params}`);
+
+    const track = (handler) => (event) => {
+        lastFeedEventId = event.lastEventId;
+        handler(JSON.parse(event.data));
+        scheduleMetricsReload();
+    };
+    ticketFeed.addEventListener('ready', track(() => {}));
+    ticketFeed.addEventListener('ticket', track(({ kind, ticket }) => applyTicketChange(ticket, kind === 'created')));
+    ticketFeed.addEventListener('deleted', track(({ id }) => removeTicketCard(id)));
+    ticketFeed.addEventListener('reset', track(() => loadTickets()));
+
+    // EventSource reconnects by itself (with Last-Event-ID) unless the server refused the stream
+    ticketFeed.onerror = () => {
+        if (ticketFeed.readyState === EventSource.CLOSED) {
+            setTimeout(connectTicketFeed, FEED_RECONNECT_MS);
+        }
+    };
+}
+
+function isTicketFeedOpen() {
+    return ticketFeed !== null && ticketFeed.readyState === EventSource.OPEN;
+}
+
+// Whether ticket a is listed before ticket b (newest first)
+function isListedBefore(a, b) {
+    return a.created_at > b.created_at || (a.created_at === b.created_at && a.id > b.id);
+}
+
+// Insert or update the card of a ticket from the live feed
+function applyTicketChange(ticket, created) {
+    const statusFilter = document.getElementById('status-filter').value;
+    if (statusFilter && ticket.status !== statusFilter) {
+        removeTicketCard(ticket.id);
+        return;
+    }
+
+    const listEl = document.getElementById('tickets-list');
+    const index = currentTickets.findIndex(t => t.id === ticket.id);
+    if (index >= 0) {
+        currentTickets[index] = ticket;
+        listEl.querySelector(`[data-ticket-id="${ticket.id}"]`).outerHTML = createTicketCard(ticket);
+        return;
+    }
+
+    let position = currentTickets.findIndex(t => isListedBefore(ticket, t));
+    if (position === -1) {
+        if (nextTicketsCursor && !created) {
+            // Older than the loaded pages, it comes with "load more"
+            return;
+        }
+        position = currentTickets.length;
+    }
+
+    if (currentTickets.length === 0) {
+        listEl.innerHTML = createTicketCard(ticket);
+    } else if (position < currentTickets.length) {
+        listEl.querySelector(`[data-ticket-id="${currentTickets[position].id}"]`)
+            .insertAdjacentHTML('beforebegin', createTicketCard(ticket));
+    } else {
+        listEl.insertAdjacentHTML('beforeend', createTicketCard(ticket));
+    }
+    currentTickets.splice(position, 0, ticket);
+}
+
+function removeTicketCard(ticketId) {
+    const index = currentTickets.findIndex(t => t.id === ticketId);
+    if (index === -1) {
+        return;
+    }
+    currentTickets.splice(index, 1);
+    const listEl = document.getElementById('tickets-list');
+    listEl.querySelector(`[data-ticket-id="${ticketId}"]`).remove();
+    if (currentTickets.length === 0) {
+        listEl.innerHTML = '<p class="loading">Тикетов не найдено</p>';
+    }
+}
+
+// Refresh the metrics tab after changes, at most once a second
+function scheduleMetricsReload() {
+    if (metricsReloadTimer || !document.getElementById('metrics-tab').classList.contains('active')) {
+        return;
+    }
+    metricsReloadTimer = setTimeout(() => {
+        metricsReloadTimer = null;
+        loadMetrics(true);
+    }, 1000);
+}
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', () => {
     loadTickets();
+    connectTicketFeed();
     // Chat widget wiring
     const chatToggle = document.getElementById('chat-toggle');
     const chatWidget = document.getElementById('chat-widget');
@@ -413,7 +564,9 @@ async function sendChatToIngest(text) {
         }
 
         if (response.ok) {
-            if (result.status === 'closed_auto') {
+            if (result.status === 'queued' || result.status === 'processing') {
+                addChatMessage('bot', `📥 Обращение принято в очередь (№ ${result.queue_id}), тикет будет создан в ближайшее время`);
+            } else if (result.status === 'closed_auto') {
                 addChatMessage('bot', `✅ Решено автоматически:\n${result.answer}`);
             } else {
                 addChatMessage('bot', `📋 Тикет создан: #${result.ticket_id} (статус: ${result.status})`);